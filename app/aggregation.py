@@ -0,0 +1,169 @@
+"""
+Pluggable group-by aggregation backends for app2.py's Group By stage.
+
+Aggregation is restricted to the numeric value columns (the group key and
+non-numeric columns are never aggregated). Three backends are available:
+
+- ``pandas``: in-memory, over the already filtered frame
+- ``duckdb``: SQL over a Parquet copy of the upload, with the filter
+  predicates pushed down, multi-threaded and able to spill to disk
+- ``polars``: lazy scan of the same Parquet copy, executed by the streaming engine
+
+DuckDB and Polars are optional; only installed backends are offered.
+"""
+import importlib.util
+import os
+import tempfile
+
+from disk_sweep import sweep, touch
+
+# Kept apart from data/, where the copies would be swept with user files and listed as data sources
+PARQUET_DIR = os.environ.get(
+    "AGGREGATION_PARQUET_DIR", os.path.join(tempfile.gettempdir(), "dynamic_analytics", "parquet")
+)
+# Disk budget of the Parquet copies, swept least recently used first
+PARQUET_MAX_BYTES = int(os.environ.get("AGGREGATION_PARQUET_MAX_BYTES", 8 * 1024 ** 3))
+
+AGGREGATION_METHODS = ["Sum", "Mean", "Count", "Max", "Min"]
+_FUNCTIONS = {"Sum": "sum", "Mean": "mean", "Max": "max", "Min": "min"}
+
+
+def numeric_value_columns(df, group_by_column):
+    """
+    Numeric columns to aggregate, excluding the group key.
+    """
+    return [col for col in df.select_dtypes(include="number").columns if col != group_by_column]
+
+
+def write_parquet_copy(df, file_hash, directory=PARQUET_DIR):
+    """
+    Write ``df`` to ``<directory>/<file_hash>.parquet`` once and return the path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{file_hash}.parquet")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        sweep(directory, PARQUET_MAX_BYTES, suffixes=(".parquet", ".tmp"))
+    else:
+        touch(path)
+    return path
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class PandasBackend:
+    name = "pandas"
+    needs_parquet = False
+
+    def group_by(self, df, group_by_column, method, value_columns, predicates=()):
+        """
+        Aggregate an in-memory frame that is already filtered (``predicates`` is ignored).
+        """
+        grouped = df.groupby(group_by_column, observed=True)
+        if method == "Count":
+            return grouped.size().reset_index(name="Count")
+        return grouped[value_columns].agg(_FUNCTIONS[method]).reset_index()
+
+
+class DuckDBBackend:
+    name = "duckdb"
+    needs_parquet = True
+
+    def __init__(self):
+        import duckdb
+
+        self._duckdb = duckdb
+
+    @staticmethod
+    def _where(group_by_column, predicates):
+        clauses = [f"{_quote(group_by_column)} IS NOT NULL"]
+        params = []
+        for col, kind, value in predicates:
+            if kind == "range":
+                clauses.append(f"{_quote(col)} BETWEEN ? AND ?")
+                params.extend(value)
+            elif value:
+                clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append("FALSE")
+        return " AND ".join(clauses), params
+
+    def group_by(self, path, group_by_column, method, value_columns, predicates=()):
+        """
+        Aggregate a Parquet file, applying ``predicates`` in the scan.
+        """
+        key = _quote(group_by_column)
+        if method == "Count":
+            select = [key, 'COUNT(*) AS "Count"']
+        else:
+            function = "AVG" if method == "Mean" else _FUNCTIONS[method].upper()
+            select = [key] + [f"{function}({_quote(col)}) AS {_quote(col)}" for col in value_columns]
+        where, params = self._where(group_by_column, predicates)
+        sql = (
+            f"SELECT {', '.join(select)} FROM read_parquet(?) "
+            f"WHERE {where} GROUP BY {key} ORDER BY {key}"
+        )
+        with self._duckdb.connect() as con:
+            return con.execute(sql, [path, *params]).df()
+
+
+class PolarsBackend:
+    name = "polars"
+    needs_parquet = True
+
+    def __init__(self):
+        import polars
+
+        self._pl = polars
+
+    def group_by(self, path, group_by_column, method, value_columns, predicates=()):
+        """
+        Aggregate a Parquet file lazily, applying ``predicates`` in the scan.
+        """
+        pl = self._pl
+        query = pl.scan_parquet(path).filter(pl.col(group_by_column).is_not_null())
+        for col, kind, value in predicates:
+            if kind == "range":
+                query = query.filter(pl.col(col).is_between(*value))
+            else:
+                query = query.filter(pl.col(col).is_in(list(value)))
+        if method == "Count":
+            aggregations = [pl.len().alias("Count")]
+        else:
+            aggregations = [getattr(pl.col(col), _FUNCTIONS[method])() for col in value_columns]
+        query = query.group_by(group_by_column).agg(aggregations).sort(group_by_column)
+        return query.collect(engine="streaming").to_pandas()
+
+
+_BACKENDS = {
+    "pandas": (PandasBackend, None),
+    "duckdb": (DuckDBBackend, "duckdb"),
+    "polars": (PolarsBackend, "polars"),
+}
+
+
+def available_backends():
+    """
+    Names of the backends whose dependencies are installed.
+    """
+    return [
+        name for name, (_, module) in _BACKENDS.items()
+        if module is None or importlib.util.find_spec(module) is not None
+    ]
+
+
+def get_backend(name):
+    backend_class, _ = _BACKENDS[name]
+    return backend_class()
+
+
+def group_by(source, group_by_column, method, value_columns, backend="pandas", predicates=()):
+    """
+    Run a group-by on ``source`` (a DataFrame for pandas, a Parquet path otherwise).
+    """
+    return get_backend(backend).group_by(source, group_by_column, method, value_columns, predicates)
@@ -1,215 +1,384 @@
+import functools
+import json
+import time
+import uuid
 import dash
 import dash_bootstrap_components as dbc
-from dash import html, dcc, Input, Output, State, dash_table
-import plotly.express as px
-import pandas as pd
-import base64
-import io
-from geopy.geocoders import Nominatim
-from functools import lru_cache
+from dash import html, dcc, Input, Output, State, ALL, Patch, ctx, dash_table
+from dash.exceptions import PreventUpdate
+from dataset_cache import dataset_cache
+from data_source import get_source, is_allowed_source, list_sources, source_label
+from ingest import UPLOAD_EXTENSIONS, preprocess_upload
+from table_query import query_page
+from charts import CHART_FIELDS, build_figure, make_chart_spec
+from figure_cache import figure_cache, figure_key
+from column_index import get_column_index
+from time_series import get_time_order
+from column_stats import chart_defaults, get_column_stats, numeric_columns, summary_frame
+from dashboard import JOB_TIMEOUT, collect_cached, collect_finished, export_dataset, owns_job, submit_dashboard
+from background import background_callback
+from profiling import annotate, install_request_hooks, instrument, slowest_records
 
 # Initialize the Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
+install_request_hooks(app.server)
 
-# Helper function to preprocess uploaded data
-def preprocess_csv(contents):
-    """
-    Preprocess the uploaded CSV file and clean the data while retaining original data types.
-    """
-    # Decode file contents
-    content_type, content_string = contents.split(",")
-    decoded = base64.b64decode(content_string).decode("utf-8")
-
-    # Load the CSV into a DataFrame
-    data = pd.read_csv(io.StringIO(decoded))
-
-    # Handle missing values
-    data.fillna("N/A", inplace=True)
-
-    return data
-
-# Helper function to get latitude and longitude for city names
-@lru_cache(maxsize=100)
-def get_coordinates(city):
-    """
-    Fetch latitude and longitude for a given city name using Nominatim.
-    Uses caching to avoid repeated API calls for the same city.
-    """
-    try:
-        geolocator = Nominatim(user_agent="geoapiExercises")
-        location = geolocator.geocode(city)
-        if location:
-            return location.latitude, location.longitude
-    except Exception as e:
-        print(f"Error fetching coordinates for {city}: {e}")
-    return None, None
-
-# Layout of the app
-app.layout = dbc.Container(
-    fluid=True,
-    children=[
-        dcc.Store(id="data-store"),  # Store for uploaded data
-        dcc.Store(id="chart-store", data=[]),  # Store for charts
-        dbc.NavbarSimple(
-            brand="Advanced Data Analytics Dashboard",
-            brand_href="#",
-            color="primary",
-            dark=True,
-        ),
-        dbc.Row(
-            dbc.Col(html.H1("Upload and Explore Data", className="text-center text-primary mt-3"), width=12),
-        ),
-        dbc.Row(
-            [
-                # Sidebar for Upload and Options
-                dbc.Col(
-                    dbc.Card(
+# Layout of the app, built once on first request and reused for every page load
+@functools.lru_cache(maxsize=None)
+def serve_layout():
+    return dbc.Container(
+        fluid=True,
+        children=[
+            dcc.Store(id="data-store"),  # Key of the uploaded dataset in the server-side cache
+            dcc.Store(id="chart-store", data=[]),  # Specs of the stacked charts, in display order
+            dcc.Store(id="dashboard-job"),  # Dashboard render job being polled
+            dcc.Interval(id="dashboard-poll", interval=500, disabled=True),
+            dbc.NavbarSimple(
+                brand="Advanced Data Analytics Dashboard",
+                brand_href="#",
+                color="primary",
+                dark=True,
+            ),
+            dbc.Row(
+                dbc.Col(html.H1("Upload and Explore Data", className="text-center text-primary mt-3"), width=12),
+            ),
+            dbc.Row(
+                [
+                    # Sidebar for Upload and Options
+                    dbc.Col(
+                        dbc.Card(
+                            [
+                                html.H3("Upload Data File", className="text-center text-white"),
+                                dcc.Upload(
+                                    id="upload-data",
+                                    children=dbc.Button("Upload File", color="primary", className="w-100"),
+                                    accept=",".join(f".{ext}" for ext in UPLOAD_EXTENSIONS),
+                                    multiple=False,
+                                ),
+                                dbc.Progress(id="upload-progress", value=0, className="mt-2"),
+                                dbc.Button(
+                                    "Cancel Upload", id="cancel-upload", color="danger", size="sm",
+                                    className="mt-2 w-100", disabled=True,
+                                ),
+                                html.Div(id="upload-status", className="mt-3"),
+                                dcc.Dropdown(
+                                    id="source-path",
+                                    placeholder="Or open a file from data/",
+                                    style={"color": "black"},
+                                    className="mt-2",
+                                ),
+                                dcc.Interval(id="source-poll", interval=5000),
+                                html.Hr(),
+                                html.H4("Scoping Filters", className="text-white"),
+                                dcc.Dropdown(
+                                    id="filter-column",
+                                    placeholder="Select Column to Filter By",
+                                    style={"color": "black"},
+                                ),
+                                dcc.Checklist(
+                                    id="filter-values",
+                                    style={"color": "white"},
+                                ),
+                                html.Hr(),
+                                html.H4("Chart Options", className="text-white"),
+                                dcc.Dropdown(
+                                    id="x-axis-feature",
+                                    placeholder="Select X-axis",
+                                    style={"color": "black"},
+                                ),
+                                dcc.Dropdown(
+                                    id="y-axis-feature",
+                                    placeholder="Select Y-axis",
+                                    style={"color": "black"},
+                                ),
+                                dcc.Dropdown(
+                                    id="color-feature",
+                                    placeholder="Select Color-Coding Column",
+                                    style={"color": "black"},
+                                ),
+                                dcc.Dropdown(
+                                    id="chart-type",
+                                    options=[
+                                        {"label": "Scatter Plot", "value": "scatter"},
+                                        {"label": "Bar Chart", "value": "bar"},
+                                        {"label": "Line Chart", "value": "line"},
+                                        {"label": "Pie Chart", "value": "pie"},
+                                        {"label": "Map (Geo)", "value": "map"},
+                                        {"label": "Histogram", "value": "histogram"},
+                                        {"label": "Box Plot", "value": "box"},
+                                    ],
+                                    placeholder="Select Chart Type",
+                                    style={"color": "black"},
+                                ),
+                                html.Hr(),
+                                html.H4("Customization", className="text-white"),
+                                dcc.Dropdown(
+                                    id="chart-template",
+                                    options=[
+                                        {"label": "Plotly", "value": "plotly"},
+                                        {"label": "Plotly Dark", "value": "plotly_dark"},
+                                        {"label": "Seaborn", "value": "seaborn"},
+                                        {"label": "Simple White", "value": "simple_white"},
+                                    ],
+                                    placeholder="Select Chart Template",
+                                    style={"color": "black"},
+                                ),
+                                dcc.Dropdown(
+                                    id="line-resample",
+                                    options=[
+                                        {"label": "Resample: Auto", "value": "auto"},
+                                        {"label": "Resample: None", "value": "none"},
+                                        {"label": "Resample: Minute", "value": "minute"},
+                                        {"label": "Resample: Hour", "value": "hour"},
+                                        {"label": "Resample: Day", "value": "day"},
+                                    ],
+                                    value="auto",
+                                    clearable=False,
+                                    className="mt-2",
+                                    style={"color": "black"},
+                                ),
+                                dbc.Button(
+                                    "Generate Chart", id="generate-chart", color="success", className="mt-3 w-100"
+                                ),
+                                dbc.Progress(id="chart-progress", value=0, className="mt-2"),
+                                dbc.Button(
+                                    "Cancel Chart", id="cancel-chart", color="danger", size="sm",
+                                    className="mt-2 w-100", disabled=True,
+                                ),
+                                html.Hr(),
+                                html.H4("Dashboard", className="text-white"),
+                                dcc.Textarea(
+                                    id="dashboard-specs",
+                                    placeholder='[{"chart_type": "bar", "x": "Region", "y": "Sales"}, ...]',
+                                    style={"width": "100%", "height": "120px"},
+                                ),
+                                dbc.Button(
+                                    "Generate Dashboard", id="generate-dashboard", color="info", className="mt-2 w-100"
+                                ),
+                                html.Div(id="dashboard-status", className="mt-2", style={"color": "white"}),
+                            ],
+                            body=True,
+                            style={"backgroundColor": "#343a40"},
+                        ),
+                        width=3,
+                    ),
+                    # Main content for data preview, charts, and analytics
+                    dbc.Col(
                         [
-                            html.H3("Upload CSV File", className="text-center text-white"),
-                            dcc.Upload(
-                                id="upload-data",
-                                children=dbc.Button("Upload File", color="primary", className="w-100"),
-                                multiple=False,
-                            ),
-                            html.Div(id="upload-status", className="mt-3"),
-                            html.Hr(),
-                            html.H4("Scoping Filters", className="text-white"),
-                            dcc.Dropdown(
-                                id="filter-column",
-                                placeholder="Select Column to Filter By",
-                                style={"color": "black"},
-                            ),
-                            dcc.Checklist(
-                                id="filter-values",
-                                style={"color": "white"},
+                            dbc.Card(
+                                dash_table.DataTable(
+                                    id="preview-table",
+                                    columns=[],
+                                    style_table={"overflowX": "auto"},
+                                    page_current=0,
+                                    page_size=10,
+                                    page_action="custom",
+                                    sort_action="custom",
+                                    sort_mode="multi",
+                                    sort_by=[],
+                                    filter_action="custom",
+                                    filter_query="",
+                                ),
+                                id="data-preview",
+                                body=True,
+                                className="mt-3",
                             ),
-                            html.Hr(),
-                            html.H4("Chart Options", className="text-white"),
-                            dcc.Dropdown(
-                                id="x-axis-feature",
-                                placeholder="Select X-axis",
-                                style={"color": "black"},
-                            ),
-                            dcc.Dropdown(
-                                id="y-axis-feature",
-                                placeholder="Select Y-axis",
-                                style={"color": "black"},
-                            ),
-                            dcc.Dropdown(
-                                id="color-feature",
-                                placeholder="Select Color-Coding Column",
-                                style={"color": "black"},
-                            ),
-                            dcc.Dropdown(
-                                id="chart-type",
-                                options=[
-                                    {"label": "Scatter Plot", "value": "scatter"},
-                                    {"label": "Bar Chart", "value": "bar"},
-                                    {"label": "Line Chart", "value": "line"},
-                                    {"label": "Pie Chart", "value": "pie"},
-                                    {"label": "Map (Geo)", "value": "map"},
-                                    {"label": "Histogram", "value": "histogram"},
-                                    {"label": "Box Plot", "value": "box"},
+                            dbc.Card(
+                                [
+                                    html.H4("Analytics Summary", className="text-white"),
+                                    html.Div(id="analytics-summary", style={"color": "white"}),
                                 ],
-                                placeholder="Select Chart Type",
-                                style={"color": "black"},
+                                body=True,
+                                style={"backgroundColor": "#3c4043"},
                             ),
-                            html.Hr(),
-                            html.H4("Customization", className="text-white"),
-                            dcc.Dropdown(
-                                id="chart-template",
-                                options=[
-                                    {"label": "Plotly", "value": "plotly"},
-                                    {"label": "Plotly Dark", "value": "plotly_dark"},
-                                    {"label": "Seaborn", "value": "seaborn"},
-                                    {"label": "Simple White", "value": "simple_white"},
+                            dbc.Row(id="chart-output", children=[], className="mt-3"),
+                            dbc.Card(
+                                [
+                                    html.H4("Performance", className="text-white"),
+                                    html.Div(id="perf-panel", style={"color": "white"}),
+                                    dcc.Interval(id="perf-poll", interval=5000),
                                 ],
-                                placeholder="Select Chart Template",
-                                style={"color": "black"},
-                            ),
-                            dbc.Button(
-                                "Generate Chart", id="generate-chart", color="success", className="mt-3 w-100"
+                                body=True,
+                                className="mt-3",
+                                style={"backgroundColor": "#3c4043"},
                             ),
                         ],
-                        body=True,
-                        style={"backgroundColor": "#343a40"},
+                        width=9,
                     ),
-                    width=3,
-                ),
-                # Main content for data preview, charts, and analytics
-                dbc.Col(
-                    [
-                        dbc.Card(id="data-preview", body=True, className="mt-3"),
-                        dbc.Card(
-                            [
-                                html.H4("Analytics Summary", className="text-white"),
-                                html.Div(id="analytics-summary", style={"color": "white"}),
-                            ],
-                            body=True,
-                            style={"backgroundColor": "#3c4043"},
-                        ),
-                        dbc.Row(id="chart-output", className="mt-3"),
-                    ],
-                    width=9,
-                ),
-            ]
-        ),
-    ],
-)
+                ]
+            ),
+        ],
+    )
+
+app.layout = serve_layout
+
+DATASET_OUTPUTS = [
+    ("data-store", "data"),
+    ("upload-status", "children"),
+    ("preview-table", "columns"),
+    ("preview-table", "page_current"),
+    ("filter-column", "options"),
+    ("x-axis-feature", "options"),
+    ("y-axis-feature", "options"),
+    ("color-feature", "options"),
+    ("analytics-summary", "children"),
+    ("x-axis-feature", "value"),
+    ("y-axis-feature", "value"),
+]
+
+# Helper function to build the outputs shared by every way of loading a dataset
+def dataset_outputs(data, dataset_key, status):
+    # Column statistics are profiled once and cached with the dataset
+    stats = get_column_stats(dataset_key)
+
+    # Generate dropdown options dynamically
+    column_options = [{"label": col, "value": col} for col in data.columns]
+    numeric_options = [{"label": col, "value": col} for col in numeric_columns(stats)]
+    filter_options = [
+        {"label": f"{col} ({'~' if column.distinct_estimated else ''}{column.distinct:,} values)", "value": col}
+        for col, column in stats.items()
+    ]
+    x_default, y_default = chart_defaults(stats)
+
+    # Generate analytics summary
+    missing = sum(column.nulls for column in stats.values())
+    analytics_summary = html.Div(
+        [
+            html.Div(f"Total Rows: {len(data):,} | Total Columns: {len(data.columns)} | Missing Values: {missing:,}"),
+            dbc.Table.from_dataframe(
+                summary_frame(stats), striped=True, bordered=False, hover=True, size="sm", color="dark",
+            ),
+        ]
+    )
+
+    # Preview columns; rows are paged in by update_preview_page
+    preview_columns = [{"name": col, "id": col} for col in data.columns]
+
+    return (
+        dataset_key,
+        status,
+        preview_columns,
+        0,
+        filter_options,
+        column_options,
+        numeric_options,
+        column_options,
+        analytics_summary,
+        x_default,
+        y_default,
+    )
+
+# Helper function for the outputs of a failed or empty load
+def empty_outputs(status):
+    return None, status, [], 0, [], [], [], [], "", None, None
 
 # Callback to handle data upload and dynamically generate dropdown options
-@app.callback(
-    [
-        Output("data-store", "data"),
-        Output("upload-status", "children"),
-        Output("data-preview", "children"),
-        Output("filter-column", "options"),
-        Output("x-axis-feature", "options"),
-        Output("y-axis-feature", "options"),
-        Output("color-feature", "options"),
-        Output("analytics-summary", "children"),
-    ],
+# (runs as a background job with parse progress and cancellation)
+@background_callback(
+    app,
+    [Output(component_id, prop) for component_id, prop in DATASET_OUTPUTS],
     [Input("upload-data", "contents")],
     [State("upload-data", "filename")],
+    progress=[Output("upload-progress", "value"), Output("upload-progress", "label")],
+    cancel=[Input("cancel-upload", "n_clicks")],
+    running=[
+        (Output("upload-data", "disabled"), True, False),
+        (Output("cancel-upload", "disabled"), False, True),
+    ],
 )
-def handle_data(contents, filename):
+@instrument()
+def handle_data(set_progress, contents, filename):
     if contents:
         try:
             # Preprocess the uploaded file
-            data = preprocess_csv(contents)
-
-            # Generate dropdown options dynamically
-            column_options = [{"label": col, "value": col} for col in data.columns]
-            numeric_options = [{"label": col, "value": col} for col in data.select_dtypes(include=["number"]).columns]
-
-            # Generate analytics summary
-            summary = f"""
-            Total Rows: {len(data)} | Total Columns: {len(data.columns)} | Missing Values: {data.isnull().sum().sum()}
-            """
-            analytics_summary = html.Div(summary)
-
-            # Preview table
-            preview_table = dash_table.DataTable(
-                data=data.to_dict("records"),
-                columns=[{"name": col, "id": col} for col in data.columns],
-                style_table={"overflowX": "auto"},
-                page_size=10,
+            data, ingest_report = preprocess_upload(
+                contents,
+                progress=lambda fraction, message: set_progress((round(fraction * 100), message)),
             )
-            return (
-                data.to_dict("records"),
-                dbc.Alert("File uploaded successfully!", color="success"),
-                preview_table,
-                column_options,
-                column_options,
-                numeric_options,
-                column_options,
-                analytics_summary,
+            annotate(rows=len(data), parse_ms=round(ingest_report.parse_seconds * 1000, 3))
+
+            # Keep the frame server-side; the browser only holds its key
+            set_progress((95, "Caching dataset"))
+            dataset_key = dataset_cache.put(data)
+            set_progress((97, "Profiling columns"))
+            get_column_stats(dataset_key)
+            set_progress((100, "Done"))
+
+            status = dbc.Alert(
+                [html.Div("File uploaded successfully!"), html.Small(ingest_report.summary())],
+                color="success",
             )
+            return dataset_outputs(data, dataset_key, status)
 
         except Exception as e:
-            return None, dbc.Alert(f"Error processing file: {e}", color="danger"), None, [], [], [], [], ""
+            return empty_outputs(dbc.Alert(f"Error processing file: {e}", color="danger"))
+
+    return empty_outputs(dbc.Alert("No file uploaded.", color="warning"))
+
+# Callback to open a server-side file or partition directory, and to reload it
+# when the watch poll sees one of its partitions change on disk
+@app.callback(
+    [Output(component_id, prop, allow_duplicate=True) for component_id, prop in DATASET_OUTPUTS],
+    [Input("source-path", "value"), Input("source-poll", "n_intervals")],
+    [State("data-store", "data")],
+    prevent_initial_call=True,
+)
+@instrument()
+def open_source(path, n_intervals, current_key):
+    if not path or not is_allowed_source(path):
+        raise PreventUpdate
+    source = get_source(path)
+    if ctx.triggered_id == "source-poll":
+        # Only the source on screen is watched, and only a stat is done per poll
+        if current_key != source.dataset_key or not source.changed():
+            raise PreventUpdate
+    try:
+        reloaded = source.refresh()
+        data = source.load()
+        dataset_key = source.dataset_key
+        if dataset_key not in dataset_cache:
+            dataset_cache.put(data, key=dataset_key)
+        annotate(rows=len(data), partitions_reloaded=len(reloaded))
+    except Exception as e:
+        return empty_outputs(dbc.Alert(f"Error opening {source_label(path)}: {e}", color="danger"))
+
+    status = dbc.Alert(
+        [
+            html.Div(f"Opened {source_label(path)}"),
+            html.Small(f"{len(data):,} rows | {len(reloaded)} partition(s) read from disk"),
+        ],
+        color="success",
+    )
+    return dataset_outputs(data, dataset_key, status)
+
+# Callback to pick up files added to or removed from the data directories
+@app.callback(
+    Output("source-path", "options"),
+    Input("source-poll", "n_intervals"),
+)
+@instrument()
+def update_source_options(n_intervals):
+    return [{"label": source_label(path), "value": path} for path in list_sources()]
 
-    return None, dbc.Alert("No file uploaded.", color="warning"), None, [], [], [], [], ""
+# Callback to serve one page of the preview table from the server-side frame
+@app.callback(
+    [Output("preview-table", "data"), Output("preview-table", "page_count")],
+    [
+        Input("data-store", "data"),
+        Input("preview-table", "page_current"),
+        Input("preview-table", "page_size"),
+        Input("preview-table", "sort_by"),
+        Input("preview-table", "filter_query"),
+    ],
+)
+@instrument()
+def update_preview_page(dataset_key, page_current, page_size, sort_by, filter_query):
+    df = dataset_cache.get(dataset_key)
+    if df is None:
+        return [], 1
+    records, page_count = query_page(dataset_key, df, page_current, page_size, sort_by, filter_query)
+    annotate(rows=len(df), page_rows=len(records))
+    return records, page_count
 
 # Callback to update filter values dynamically based on the selected column
 @app.callback(
@@ -217,16 +386,37 @@ def handle_data(contents, filename):
     Input("filter-column", "value"),
     State("data-store", "data"),
 )
-def update_filter_values(filter_column, data):
-    if data and filter_column:
-        df = pd.DataFrame(data)
-        unique_values = df[filter_column].unique()
-        return [{"label": str(val), "value": str(val)} for val in unique_values]
+@instrument()
+def update_filter_values(filter_column, dataset_key):
+    if dataset_key in dataset_cache and filter_column:
+        # Distinct values come from the dataset's column index, built once per column
+        return get_column_index(dataset_key, filter_column).options()
     return []
 
-# Callback for generating charts dynamically and stacking them
-@app.callback(
-    Output("chart-store", "data"),
+# Helper function to wrap a figure in a removable chart card
+def chart_card(chart_id, figure):
+    return html.Div(
+        [
+            dbc.Button(
+                "Remove",
+                id={"type": "remove-chart", "index": chart_id},
+                color="secondary",
+                size="sm",
+                className="float-end",
+            ),
+            dcc.Graph(id={"type": "chart-graph", "index": chart_id}, figure=figure),
+        ],
+        className="mb-3",
+    )
+
+# Callback for generating charts and appending them to the stack
+# (runs as a background job so map geocoding reports progress and can be cancelled)
+@background_callback(
+    app,
+    [
+        Output("chart-store", "data"),
+        Output("chart-output", "children"),
+    ],
     [
         Input("generate-chart", "n_clicks"),
         State("filter-column", "value"),
@@ -235,13 +425,21 @@ def update_filter_values(filter_column, data):
         State("y-axis-feature", "value"),
         State("color-feature", "value"),
         State("chart-template", "value"),
+        State("line-resample", "value"),
         State("chart-type", "value"),
         State("data-store", "data"),
-        State("chart-store", "data"),
     ],
     prevent_initial_call=True,
+    progress=[Output("chart-progress", "value"), Output("chart-progress", "label")],
+    cancel=[Input("cancel-chart", "n_clicks")],
+    running=[
+        (Output("generate-chart", "disabled"), True, False),
+        (Output("cancel-chart", "disabled"), False, True),
+    ],
 )
+@instrument()
 def generate_chart(
+    set_progress,
     n_clicks,
     filter_column,
     filter_values,
@@ -249,71 +447,227 @@ def generate_chart(
     y_feature,
     color_feature,
     template,
+    resample,
     chart_type,
-    data,
-    existing_charts,
+    dataset_key,
 ):
-    if not data:
-        return existing_charts
-
-    df = pd.DataFrame(data)
+    df = dataset_cache.get(dataset_key)
+    if df is None:
+        raise PreventUpdate
 
-    # Apply scoping filters
-    if filter_column and filter_values:
-        df = df[df[filter_column].isin(filter_values)]
+    spec = make_chart_spec(
+        chart_type, x_feature, y_feature, color_feature, template, filter_column, filter_values, resample
+    )
+    if spec["chart_type"] not in CHART_FIELDS:
+        raise PreventUpdate
 
     try:
-        if chart_type == "map":
-            # Add latitude and longitude for cities
-            df[["lat", "lon"]] = df["City"].apply(
-                lambda city: pd.Series(get_coordinates(city))
+        # Identical spec on identical data: reuse the cached figure
+        cache_key = figure_key(dataset_cache.fingerprint(dataset_key), spec)
+        figure = figure_cache.get(cache_key)
+        annotate(rows=len(df), chart_type=spec["chart_type"], cache_hit=figure is not None)
+        if figure is None:
+            column_index = get_column_index(dataset_key, spec["filter_column"]) if spec["filter_column"] else None
+            # Line charts over a date column reuse the dataset's cached time order
+            order = get_time_order(dataset_key, spec["x"]) if spec["chart_type"] == "line" and spec["x"] else None
+            fig = build_figure(
+                df,
+                spec,
+                column_index,
+                time_order=order,
+                progress=lambda done, total: set_progress(
+                    (round(100 * done / max(1, total)), f"Geocoding {done}/{total}")
+                ),
             )
-            df = df.dropna(subset=["lat", "lon"])  # Drop rows with missing coordinates
+            if fig is None:
+                raise PreventUpdate  # Nothing to draw; leave the stack unchanged
+            figure = figure_cache.put(cache_key, fig)
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Error generating chart: {e}")
+        raise PreventUpdate
 
-            if df.empty:
-                print("No valid coordinates found for the selected data.")
-                return existing_charts  # Return without adding a new chart
+    # Append only the new chart; existing graphs are not re-sent
+    chart_id = uuid.uuid4().hex
+    specs = Patch()
+    specs.append({"id": chart_id, "dataset": dataset_key, "spec": spec})
+    children = Patch()
+    children.append(chart_card(chart_id, figure))
+    return specs, children
 
-            # Create map chart
-            fig = px.scatter_geo(
-                df,
-                lat="lat",
-                lon="lon",
-                size=y_feature,
-                color=color_feature,
-                template=template or "plotly_dark",
-                title="Map Visualization",
+# Callback to remove a single chart from the stack
+@app.callback(
+    [
+        Output("chart-store", "data", allow_duplicate=True),
+        Output("chart-output", "children", allow_duplicate=True),
+    ],
+    Input({"type": "remove-chart", "index": ALL}, "n_clicks"),
+    State("chart-store", "data"),
+    prevent_initial_call=True,
+)
+@instrument()
+def remove_chart(n_clicks, charts):
+    # Adding a card also fires this callback, with n_clicks still None
+    if not ctx.triggered_id or not ctx.triggered[0]["value"]:
+        raise PreventUpdate
+    chart_ids = [chart["id"] for chart in charts or []]
+    if ctx.triggered_id["index"] not in chart_ids:
+        raise PreventUpdate
+
+    position = chart_ids.index(ctx.triggered_id["index"])
+    specs = Patch()
+    del specs[position]
+    children = Patch()
+    del children[position]
+    return specs, children
+
+# Helper function to append rendered charts to the stack
+def append_charts(charts, dataset_key):
+    specs = Patch()
+    children = Patch()
+    for chart_id, spec, figure in charts:
+        specs.append({"id": chart_id, "dataset": dataset_key, "spec": spec})
+        children.append(chart_card(chart_id, figure))
+    return specs, children
+
+# Callback to start rendering a list of chart specs in parallel
+@app.callback(
+    [
+        Output("chart-store", "data", allow_duplicate=True),
+        Output("chart-output", "children", allow_duplicate=True),
+        Output("dashboard-job", "data"),
+        Output("dashboard-poll", "disabled"),
+        Output("dashboard-status", "children"),
+    ],
+    Input("generate-dashboard", "n_clicks"),
+    State("dashboard-specs", "value"),
+    State("data-store", "data"),
+    prevent_initial_call=True,
+)
+@instrument()
+def generate_dashboard(n_clicks, specs_text, dataset_key):
+    df = dataset_cache.get(dataset_key)
+    if df is None:
+        return dash.no_update, dash.no_update, None, True, "Upload a file first."
+    try:
+        requested = json.loads(specs_text or "[]")
+        specs = [
+            make_chart_spec(
+                item.get("chart_type"),
+                item.get("x"),
+                item.get("y"),
+                item.get("color"),
+                item.get("template"),
+                item.get("filter_column"),
+                item.get("filter_values"),
+                item.get("resample"),
             )
-        elif chart_type == "scatter":
-            fig = px.scatter(df, x=x_feature, y=y_feature, color=color_feature, template=template or "plotly_dark")
-        elif chart_type == "bar":
-            fig = px.bar(df, x=x_feature, y=y_feature, color=color_feature, template=template or "plotly_dark")
-        elif chart_type == "line":
-            fig = px.line(df, x=x_feature, y=y_feature, color=color_feature, template=template or "plotly_dark")
-        elif chart_type == "pie":
-            fig = px.pie(df, names=x_feature, values=y_feature, template=template or "plotly_dark")
-        elif chart_type == "histogram":
-            fig = px.histogram(df, x=x_feature, color=color_feature, template=template or "plotly_dark")
-        elif chart_type == "box":
-            fig = px.box(df, x=x_feature, y=y_feature, color=color_feature, template=template or "plotly_dark")
+            for item in requested
+        ]
+    except (ValueError, AttributeError, TypeError) as e:
+        return dash.no_update, dash.no_update, None, True, f"Invalid dashboard specs: {e}"
+    specs = [spec for spec in specs if spec["chart_type"] in CHART_FIELDS]
+    if not specs:
+        return dash.no_update, dash.no_update, None, True, "No valid chart specs."
+
+    # Cached figures are shown immediately; the rest are rendered in the process pool
+    fingerprint = dataset_cache.fingerprint(dataset_key)
+    ready, pending = [], []
+    for spec in specs:
+        chart_id = uuid.uuid4().hex
+        figure = figure_cache.get(figure_key(fingerprint, spec))
+        if figure is not None:
+            ready.append((chart_id, spec, figure))
         else:
-            return existing_charts
+            pending.append((chart_id, spec))
 
-        # Append the new chart to existing charts
-        existing_charts.append(dcc.Graph(figure=fig))
-        return existing_charts
+    specs_patch, children_patch = append_charts(ready, dataset_key)
+    if not pending:
+        return specs_patch, children_patch, None, True, f"Rendered {len(ready)} charts (all cached)."
 
-    except Exception as e:
-        print(f"Error generating chart: {e}")
-        return existing_charts
+    job_id = submit_dashboard(export_dataset(df, fingerprint), pending, fingerprint)
+    job = {
+        "job": job_id,
+        "dataset": dataset_key,
+        "fingerprint": fingerprint,
+        "pending": pending,
+        "started": time.time(),
+        "total": len(specs),
+        "done": len(ready),
+    }
+    return specs_patch, children_patch, job, False, f"Rendering {len(pending)} of {len(specs)} charts..."
 
-# Callback to update the chart output with stacked charts
+# Callback to append dashboard charts as each one finishes
 @app.callback(
-    Output("chart-output", "children"),
-    Input("chart-store", "data"),
+    [
+        Output("chart-store", "data", allow_duplicate=True),
+        Output("chart-output", "children", allow_duplicate=True),
+        Output("dashboard-job", "data", allow_duplicate=True),
+        Output("dashboard-poll", "disabled", allow_duplicate=True),
+        Output("dashboard-status", "children", allow_duplicate=True),
+    ],
+    Input("dashboard-poll", "n_intervals"),
+    State("dashboard-job", "data"),
+    prevent_initial_call=True,
 )
-def update_chart_output(charts):
-    return charts
+@instrument()
+def poll_dashboard(n_intervals, job):
+    if not job:
+        return dash.no_update, dash.no_update, None, True, dash.no_update
+    if owns_job(job["job"]):
+        finished = [
+            (chart_id, spec, None if figure_json is None else json.loads(figure_json))
+            for chart_id, spec, figure_json in collect_finished(job["job"])[0]
+        ]
+    else:
+        # Started by another worker process; its figures arrive through the shared figure cache
+        finished = collect_cached(job["pending"], job["fingerprint"])
+    finished_ids = {chart_id for chart_id, _, _ in finished}
+    pending = [entry for entry in job["pending"] if entry[0] not in finished_ids]
+    if pending and time.time() - job["started"] > JOB_TIMEOUT:
+        status = f"Rendered {job['done']} of {job['total']} charts (timed out)."
+        return dash.no_update, dash.no_update, None, True, status
+    if not finished and pending:
+        raise PreventUpdate
+
+    # Failed charts come back as None and are skipped
+    ready = [(chart_id, spec, figure) for chart_id, spec, figure in finished if figure is not None]
+    specs_patch, children_patch = append_charts(ready, job["dataset"])
+    job = dict(job, pending=pending, done=job["done"] + len(finished))
+    if pending:
+        return specs_patch, children_patch, job, False, f"Rendered {job['done']} of {job['total']} charts..."
+    return specs_patch, children_patch, None, True, f"Rendered {job['done']} of {job['total']} charts."
+
+# Callback to list the slowest recent callbacks (not instrumented itself, to keep the list clean)
+@app.callback(
+    Output("perf-panel", "children"),
+    Input("perf-poll", "n_intervals"),
+)
+def update_perf_panel(n_intervals):
+    rows = [
+        {
+            "Callback": record["name"],
+            "Wall (ms)": record.get("wall_ms"),
+            "CPU (ms)": record.get("cpu_ms"),
+            "In (bytes)": record.get("bytes_in"),
+            "Out (bytes)": record.get("bytes_out"),
+            "Rows": record.get("rows"),
+            "Cache hit": record.get("cache_hit"),
+            "Time": record["ts"][11:19],
+        }
+        # The log is shared with app2.py, whose pipeline stages are not callbacks
+        for record in slowest_records(10, kinds=("callback", "background_result"))
+    ]
+    cache = figure_cache.stats()
+    return [
+        dash_table.DataTable(
+            data=rows,
+            columns=[{"name": name, "id": name} for name in rows[0]] if rows else [],
+            style_table={"overflowX": "auto"},
+        ),
+        html.Small(f"Figure cache: {cache['hits']} hits / {cache['misses']} misses, {cache['entries']} entries"),
+    ]
 
 if __name__ == "__main__":
     app.run_server(debug=True)
@@ -1,67 +1,301 @@
+import hashlib
+import os
 import streamlit as st
 import pandas as pd
-import json
-import altair as alt
+from drilldown import DrilldownTree, compact_payload, dumps_payload
+from rollup import RollupCube
+from filters import MaskCache, active_predicates
+from profiling import annotate, measure
+from column_stats import chart_defaults, profile_frame, summary_frame
+from data_source import get_source, list_sources, source_label
+from disk_sweep import sweep, touch
+from ingest import COLUMNAR_FORMATS, UPLOAD_EXTENSIONS, load_bytes, optimize_dtypes, read_column_names
+from aggregation import AGGREGATION_METHODS, available_backends, group_by, numeric_value_columns, write_parquet_copy
+
+# Streamlit serves app/static at app/static/ when server.enableStaticServing is on
+DRILLDOWN_STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "drilldown")
+DRILLDOWN_STATIC_MAX_BYTES = int(os.environ.get("DRILLDOWN_STATIC_MAX_BYTES", 256 * 1024 ** 2))
+
+# Stage timings for the current rerun: (stage, seconds, computed)
+stage_timings = []
+# Stages whose cached function body actually ran during this rerun
+computed_stages = set()
+
+def run_stage(name, func, *args):
+    """
+    Call a cached pipeline stage and record its time and whether it hit the cache.
+    """
+    with measure("stage", name) as record:
+        result = func(*args)
+        computed = name in computed_stages
+        annotate(cache_hit=not computed, rows=len(result) if isinstance(result, pd.DataFrame) else None)
+    stage_timings.append((name, record["wall_ms"] / 1000, computed))
+    return result
+
+# Pipeline stages. Each is cached on the upload's hash plus its own parameters,
+# so changing one widget only recomputes the stages downstream of it. Frames are
+# passed as underscore arguments, which Streamlit does not hash.
+@st.cache_data(max_entries=8)
+def columns_stage(file_hash, _raw):
+    """
+    Column names from the file's schema or header, without reading its rows.
+    """
+    return read_column_names(_raw)
+
+@st.cache_resource(max_entries=4, show_spinner="Reading file...")
+def load_stage(scope_key, _raw):
+    """
+    Read the scoped columns only; Parquet/Feather/Arrow skip the other columns entirely.
+    """
+    computed_stages.add("load")
+    _, columns = scope_key
+    data, fmt, _ = load_bytes(_raw, columns=list(columns) if columns is not None else None)
+    if fmt not in COLUMNAR_FORMATS:
+        optimize_dtypes(data)
+    return data
+
+@st.cache_resource(max_entries=4, show_spinner="Reading files...")
+def source_stage(scope_key, _source):
+    """
+    Scoped columns of a server-side source; the key's signature changes whenever a partition does.
+    """
+    computed_stages.add("load")
+    _, columns = scope_key
+    data = _source.load()
+    return data[list(columns)] if columns is not None else data
+
+@st.fragment(run_every=5)
+def watch_source(source):
+    """
+    Poll the source's partition files (stat only) and rerun the app when one changed.
+    """
+    if source.changed():
+        st.rerun()
+
+@st.cache_data(max_entries=8)
+def stats_stage(scope_key, _scoped_data):
+    """
+    Column statistics of the scoped frame, profiled once per scope.
+    """
+    computed_stages.add("column stats")
+    return profile_frame(_scoped_data)
+
+@st.cache_data(max_entries=8)
+def filter_options_stage(scope_key, _stats, _scoped_data):
+    """
+    Slider bounds for numeric columns and choices for the others, taken from the column statistics.
+    """
+    computed_stages.add("filter options")
+    options = {}
+    for col, column in _stats.items():
+        if column.kind == "numeric":
+            bounds = [float("nan") if value is None else float(value) for value in (column.min, column.max)]
+            options[col] = ("range", *bounds)
+        elif column.kind == "bool":
+            # The profile keeps no min/max for bools; offer them as False/True choices
+            options[col] = ("values", sorted(column.values or []))
+        elif column.values is not None:
+            options[col] = ("values", [value for value in column.values if value is not None])
+        else:
+            # Too many distinct values to keep in the profile
+            options[col] = ("values", _scoped_data[col].dropna().unique().tolist())
+    return options
+
+@st.cache_resource(max_entries=8)
+def mask_cache_stage(scope_key, _scoped_data):
+    """
+    Per-column filter masks for a scoped frame, reused across reruns.
+    """
+    return MaskCache(_scoped_data)
+
+@st.cache_resource(max_entries=16)
+def filter_stage(filter_key, _mask_cache):
+    computed_stages.add("filter")
+    _, predicates = filter_key
+    return _mask_cache.apply(predicates)
+
+@st.cache_resource(max_entries=4)
+def parquet_stage(scope_key, _df):
+    """
+    Parquet copy of the scoped upload for the DuckDB/Polars aggregation backends.
+    """
+    computed_stages.add("parquet copy")
+    copy_name = hashlib.blake2b(repr(scope_key).encode(), digest_size=16).hexdigest()
+    return write_parquet_copy(_df, copy_name)
+
+@st.cache_resource(max_entries=4)
+def cube_stage(cube_key, _filtered_data):
+    """
+    Rollup cube of the filtered rows; the key carries the filter state, so a new filter builds a new cube.
+    """
+    computed_stages.add("rollup cube")
+    _, dimensions, measures = cube_key
+    return RollupCube(_filtered_data, dimensions, measures)
+
+@st.cache_resource(max_entries=16)
+def group_stage(group_key, _aggregation_input):
+    computed_stages.add("group by")
+    (_, predicates), group_by_column, aggregation_method, value_columns, backend = group_key
+    if backend == "cube":
+        return _aggregation_input.group_by(group_by_column, aggregation_method, list(value_columns))
+    return group_by(
+        _aggregation_input, group_by_column, aggregation_method, list(value_columns), backend, predicates
+    )
+
+@st.cache_data(max_entries=16)
+def drilldown_stage(drilldown_key, _filtered_data, _cube=None):
+    computed_stages.add("drill-down")
+    _, drill_columns, aggregation_column = drilldown_key
+    if _cube is not None:
+        tree = _cube.drilldown_tree(list(drill_columns), aggregation_column)
+    else:
+        tree = DrilldownTree(_filtered_data, list(drill_columns), aggregation_column)
+    return compact_payload(tree)
+
+def static_levels_stage(drilldown_key, payload):
+    """
+    Write the drill-down levels below the top one as static files and return their URLs.
+
+    Not cached: a file the sweep removed is written again on the next rerun.
+    """
+    name = hashlib.blake2b(repr(drilldown_key).encode(), digest_size=16).hexdigest()
+    os.makedirs(DRILLDOWN_STATIC_DIR, exist_ok=True)
+    urls = [None]
+    for depth, level in enumerate(payload["levels"][1:], start=1):
+        filename = f"{name}-{depth}.json"
+        path = os.path.join(DRILLDOWN_STATIC_DIR, filename)
+        if os.path.exists(path):
+            touch(path)
+        else:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(dumps_payload(level))
+            os.replace(tmp_path, path)
+        urls.append(f"app/static/drilldown/{filename}")
+    sweep(DRILLDOWN_STATIC_DIR, DRILLDOWN_STATIC_MAX_BYTES, suffixes=(".json", ".tmp"))
+    return urls
 
 # Title of the Streamlit app
 st.title("Dynamic Data Visualization with Multi-Level Drill-Down and Optional Features")
 
-# File uploader for CSV data
-uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
-
-if uploaded_file is not None:
-    # Read the uploaded CSV file
-    df = pd.read_csv(uploaded_file)
-    st.success("File uploaded successfully!")
+# Data source: a browser upload, or a file/partition directory under data/
+source_paths = list_sources()
+data_source = st.sidebar.radio("Data Source", ["Upload", "Local files"]) if source_paths else "Upload"
+uploaded_file = None
+source = None
+if data_source == "Upload":
+    # File uploader for CSV (optionally gzip/zstd compressed), Parquet, Feather or Arrow data
+    uploaded_file = st.file_uploader("Upload a data file", type=list(UPLOAD_EXTENSIONS))
+else:
+    source_path = st.selectbox("Select a data file or directory", options=source_paths, format_func=source_label)
+    source = get_source(source_path)
+    # Re-reads only the partitions that changed since the last rerun
+    source.refresh()
+    if st.sidebar.checkbox("Watch for changes"):
+        watch_source(source)
 
-    # Display the dataset
-    st.header("Uploaded Dataset")
-    st.dataframe(df)
+if uploaded_file is not None or source is not None:
+    if source is not None:
+        file_hash = source.signature
+        all_columns = source.load().columns.tolist()
+    else:
+        # Hash and read the upload in place; the buffer is shared, not copied
+        raw = uploaded_file.getbuffer()
+        file_hash = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        all_columns = columns_stage(file_hash, raw)
 
-    # Scoping: Allow users to optionally select columns
+    # Scoping: Allow users to optionally select columns. Only the scoped
+    # columns are read from the file (column projection).
     if st.sidebar.checkbox("Enable Scoping"):
         st.sidebar.header("Scoping Options")
         scoped_columns = st.sidebar.multiselect(
             "Select Columns to Include in Visualizations",
-            options=df.columns,
-            default=df.columns.tolist()  # Default: include all columns
+            options=all_columns,
+            default=all_columns  # Default: include all columns
         )
-        scoped_data = df[scoped_columns]
+        scope_key = (file_hash, tuple(scoped_columns))
+    else:
+        scoped_columns = list(all_columns)
+        scope_key = (file_hash, None)
+
+    # Read the data (cached on the file's content hash or partition signature, and scoped columns)
+    if source is not None:
+        df = run_stage("load", source_stage, scope_key, source)
     else:
-        scoped_data = df
-        scoped_columns = df.columns.tolist()
+        df = run_stage("load", load_stage, scope_key, raw)
+    scoped_data = df
+    st.success("File uploaded successfully!" if source is None else f"Opened {source_label(source.path)}")
+
+    # Display the dataset
+    st.header("Uploaded Dataset")
+    st.dataframe(df)
 
     st.subheader("Scoped Data")
     st.dataframe(scoped_data)
 
+    column_stats = run_stage("column stats", stats_stage, scope_key, scoped_data)
+    with st.expander("Column Profile"):
+        st.dataframe(summary_frame(column_stats))
+
     # Filtering: Add optional filtering options
     if st.sidebar.checkbox("Enable Filtering"):
         st.sidebar.header("Filtering Options")
-        filtered_data = scoped_data.copy()
+        filter_options = run_stage("filter options", filter_options_stage, scope_key, column_stats, scoped_data)
+        predicates = []
 
         for col in scoped_columns:
-            if pd.api.types.is_numeric_dtype(scoped_data[col]):
+            kind, *bounds = filter_options[col]
+            if kind == "range":
+                min_bound, max_bound = bounds
                 min_val, max_val = st.sidebar.slider(
                     f"Filter {col}",
-                    min_value=float(scoped_data[col].min()),
-                    max_value=float(scoped_data[col].max()),
-                    value=(float(scoped_data[col].min()), float(scoped_data[col].max()))
+                    min_value=min_bound,
+                    max_value=max_bound,
+                    value=(min_bound, max_bound)
                 )
-                filtered_data = filtered_data[(filtered_data[col] >= min_val) & (filtered_data[col] <= max_val)]
+                predicates.append((col, "range", (min_val, max_val)))
             else:
-                unique_values = scoped_data[col].dropna().unique()
+                unique_values = bounds[0]
                 selected_values = st.sidebar.multiselect(
                     f"Filter {col}",
                     options=unique_values,
-                    default=unique_values.tolist()
+                    default=unique_values
                 )
-                filtered_data = filtered_data[filtered_data[col].isin(selected_values)]
+                predicates.append((col, "values", tuple(selected_values)))
+
+        # No-op predicates are dropped from the key, so untouched widgets share a cache entry
+        filter_key = (scope_key, active_predicates(predicates, filter_options))
+        mask_cache = mask_cache_stage(scope_key, scoped_data)
+        filtered_data = run_stage("filter", filter_stage, filter_key, mask_cache)
     else:
         filtered_data = scoped_data
+        filter_key = (scope_key, ())
 
     st.subheader("Filtered Data")
     st.dataframe(filtered_data)
 
+    # Rollup cube: pre-aggregate the filtered rows once for the chosen dimensions,
+    # then answer group-bys and drill-downs over those dimensions from the cube
+    cube = None
+    if st.sidebar.checkbox("Enable Rollup Cube"):
+        st.sidebar.header("Rollup Cube Options")
+        cube_dimensions = st.sidebar.multiselect(
+            "Select Cube Dimensions",
+            options=scoped_columns,
+            # Default: the columns with a short list of distinct values
+            default=[
+                col for col in scoped_columns
+                if column_stats[col].kind != "numeric" and column_stats[col].values is not None
+            ]
+        )
+        if cube_dimensions:
+            cube_measures = tuple(
+                col for col in filtered_data.select_dtypes(include="number").columns if col not in cube_dimensions
+            )
+            cube_key = (filter_key, tuple(cube_dimensions), cube_measures)
+            cube = run_stage("rollup cube", cube_stage, cube_key, filtered_data)
+            st.sidebar.caption(f"Cube: {len(cube):,} groups from {len(filtered_data):,} rows")
+
     # Group By: Add optional grouping and aggregation
     if st.sidebar.checkbox("Enable Group By"):
         st.sidebar.header("Group By Options")
@@ -72,23 +306,33 @@ if uploaded_file is not None:
         )
         aggregation_method = st.sidebar.selectbox(
             "Select Aggregation Method",
-            options=["Sum", "Mean", "Count", "Max", "Min"],
+            options=AGGREGATION_METHODS,
             index=0  # Default to 'Sum'
         )
+        aggregation_backend = st.sidebar.selectbox(
+            "Aggregation Engine",
+            # With a rollup cube built, answering from it is offered first
+            options=(["cube"] if cube is not None else []) + available_backends(),
+            index=0  # Default to the cube, else in-memory pandas
+        )
 
         if group_by_column:
-            if aggregation_method == "Sum":
-                grouped_data = filtered_data.groupby(group_by_column).sum().reset_index()
-            elif aggregation_method == "Mean":
-                grouped_data = filtered_data.groupby(group_by_column).mean().reset_index()
-            elif aggregation_method == "Count":
-                grouped_data = filtered_data.groupby(group_by_column).size().reset_index(name='Count')
-            elif aggregation_method == "Max":
-                grouped_data = filtered_data.groupby(group_by_column).max().reset_index()
-            elif aggregation_method == "Min":
-                grouped_data = filtered_data.groupby(group_by_column).min().reset_index()
-
-            st.subheader(f"Grouped Data by {group_by_column} ({aggregation_method})")
+            # Only numeric columns are aggregated; the group key and text columns are skipped
+            value_columns = tuple(numeric_value_columns(filtered_data, group_by_column))
+            if aggregation_backend == "cube" and not cube.covers([group_by_column], value_columns):
+                st.sidebar.caption(f"The cube does not cover {group_by_column}; aggregating with pandas.")
+                aggregation_backend = "pandas"
+            group_key = (filter_key, group_by_column, aggregation_method, value_columns, aggregation_backend)
+            if aggregation_backend == "cube":
+                aggregation_input = cube
+            elif aggregation_backend == "pandas":
+                aggregation_input = filtered_data
+            else:
+                # Out-of-core engines scan the Parquet copy with the filters pushed down
+                aggregation_input = run_stage("parquet copy", parquet_stage, scope_key, df)
+            grouped_data = run_stage("group by", group_stage, group_key, aggregation_input)
+
+            st.subheader(f"Grouped Data by {group_by_column} ({aggregation_method}, {aggregation_backend})")
             st.dataframe(grouped_data)
         else:
             grouped_data = filtered_data
@@ -97,15 +341,27 @@ if uploaded_file is not None:
 
     # Visualization: Allow users to visualize data
     if st.sidebar.checkbox("Enable Visualization"):
+        # Altair is only needed here; importing it lazily keeps it off the first-load path
+        import altair as alt
+
         st.sidebar.header("Visualization Options")
         chart_type = st.sidebar.selectbox(
             "Select Chart Type",
             options=["Bar Chart", "Line Chart", "Scatter Plot", "Pie Chart"]
         )
-        x_axis = st.sidebar.selectbox("Select X-Axis", options=grouped_data.columns)
+        # Defaults come from the column profile: a category or date against a measure
+        x_default, y_default = chart_defaults(column_stats)
+        x_options = grouped_data.columns.tolist()
+        y_options = grouped_data.select_dtypes(include='number').columns.tolist()
+        x_axis = st.sidebar.selectbox(
+            "Select X-Axis",
+            options=x_options,
+            index=x_options.index(x_default) if x_default in x_options else 0
+        )
         y_axis = st.sidebar.selectbox(
             "Select Y-Axis (for numerical columns)",
-            options=grouped_data.select_dtypes(include='number').columns
+            options=y_options,
+            index=y_options.index(y_default) if y_default in y_options else 0
         )
 
         # Generate the selected chart
@@ -162,64 +418,81 @@ if uploaded_file is not None:
         if len(drill_columns) < 2:
             st.warning("Please select at least two columns for the drill-down hierarchy.")
         else:
-            # Function to dynamically generate the drill-down JSON
-            def transform_data_for_drilldown(df, drill_columns, aggregation_column):
-                result = {
-                    "top_level": [],
-                    "drilldown": []
-                }
-                for i, column in enumerate(drill_columns):
-                    if i == 0:
-                        grouped_data = df.groupby(column)[aggregation_column].sum().reset_index()
-                        for _, row in grouped_data.iterrows():
-                            drilldown_id = f"{column}_{row[column]}".replace(" ", "_")
-                            result["top_level"].append({
-                                "name": str(row[column]),
-                                "y": float(row[aggregation_column]),
-                                "drilldown": drilldown_id
-                            })
-                    else:
-                        prev_columns = drill_columns[:i]
-                        grouped_data = df.groupby(prev_columns + [column])[aggregation_column].sum().reset_index()
-                        for _, row in grouped_data.iterrows():
-                            prev_drilldown_id = "_".join([f"{col}_{row[col]}" for col in prev_columns]).replace(" ", "_")
-                            current_drilldown_id = f"{prev_drilldown_id}_{column}_{row[column]}".replace(" ", "_")
-                            drilldown_entry = next(
-                                (entry for entry in result["drilldown"] if entry["id"] == prev_drilldown_id), None
-                            )
-                            if not drilldown_entry:
-                                drilldown_entry = {"id": prev_drilldown_id, "data": []}
-                                result["drilldown"].append(drilldown_entry)
-                            drilldown_entry["data"].append({
-                                "name": str(row[column]),
-                                "y": float(row[aggregation_column]),
-                                "drilldown": current_drilldown_id if i < len(drill_columns) - 1 else None
-                            })
-                return result
-
             # Generate drill-down chart data
-            drilldown_data = transform_data_for_drilldown(filtered_data, drill_columns, aggregation_column)
-            top_level = drilldown_data["top_level"]
-            drilldown = drilldown_data["drilldown"]
+            drilldown_key = (filter_key, tuple(drill_columns), aggregation_column)
+            drilldown_cube = cube if cube is not None and cube.covers(drill_columns, [aggregation_column]) else None
+            drilldown_data = run_stage("drill-down", drilldown_stage, drilldown_key, filtered_data, drilldown_cube)
+
+            # Compact columnar payload. With Streamlit static file serving enabled (.streamlit/config.toml),
+            # only the top level is inlined and deeper levels are fetched when drilled into.
+            if st.get_option("server.enableStaticServing"):
+                level_urls = static_levels_stage(drilldown_key, drilldown_data)
+                inline_payload = dict(drilldown_data, levels=drilldown_data["levels"][:1], levelUrls=level_urls)
+            else:
+                inline_payload = drilldown_data
+            payload_text = dumps_payload(inline_payload)
+            st.caption(f"Drill-down payload: {len(payload_text) / 1024:,.1f} KB inlined")
 
             # Chart selection
             chart_type = st.sidebar.radio("Select Drill-Down Chart Type", ["Column Chart", "Pie Chart"])
             if chart_type == "Column Chart":
-                highchart_config = f"""
-                Highcharts.chart('container', {{
-                    chart: {{ type: 'column' }},
-                    title: {{ text: 'Drill-Down Column Chart' }},
-                    xAxis: {{ type: 'category' }},
-                    series: [{{ name: '{drill_columns[0]}', data: {json.dumps(top_level)} }}],
-                    drilldown: {{ series: {json.dumps(drilldown)} }}
-                }});"""
+                chart_options = (
+                    "type: 'column'",
+                    "title: { text: 'Drill-Down Column Chart' }, xAxis: { type: 'category' },",
+                )
             else:
-                highchart_config = f"""
+                chart_options = "type: 'pie'", "title: { text: 'Drill-Down Pie Chart' },"
+
+            # Drill-down series are built from the level arrays when a point is clicked
+            highchart_config = f"""
+                const payload = {payload_text};
+                const levels = payload.levels;
+                function loadLevel(depth) {{
+                    if (levels[depth]) return Promise.resolve(levels[depth]);
+                    return fetch(payload.levelUrls[depth])
+                        .then(function (response) {{
+                            if (!response.ok) throw new Error(response.status + ' ' + response.statusText);
+                            return response.json();
+                        }})
+                        .then(function (level) {{ return (levels[depth] = level); }});
+                }}
+                function points(depth, start, stop) {{
+                    const level = levels[depth];
+                    const leaf = depth === payload.columns.length - 1;
+                    const data = [];
+                    for (let i = start; i < stop; i++) {{
+                        data.push({{ name: level.name[i], y: level.y[i], drilldown: !leaf, depth: depth, node: i }});
+                    }}
+                    return data;
+                }}
                 Highcharts.chart('container', {{
-                    chart: {{ type: 'pie' }},
-                    title: {{ text: 'Drill-Down Pie Chart' }},
-                    series: [{{ name: '{drill_columns[0]}', data: {json.dumps(top_level)} }}],
-                    drilldown: {{ series: {json.dumps(drilldown)} }}
+                    chart: {{
+                        {chart_options[0]},
+                        events: {{
+                            drilldown: function (e) {{
+                                if (e.seriesOptions) return;
+                                const chart = this;
+                                const depth = e.point.options.depth;
+                                const node = e.point.options.node;
+                                const offsets = levels[depth].offsets;
+                                chart.showLoading();
+                                loadLevel(depth + 1).then(function () {{
+                                    chart.hideLoading();
+                                    chart.addSeriesAsDrilldown(e.point, {{
+                                        name: payload.columns[depth + 1],
+                                        data: points(depth + 1, offsets[node], offsets[node + 1])
+                                    }});
+                                }}).catch(function (error) {{
+                                    // Level file missing (swept) or unreachable; a rerun writes it again
+                                    chart.showLoading('Could not load ' + payload.columns[depth + 1]
+                                        + ' (' + error.message + '). Rerun the app to retry.');
+                                    setTimeout(function () {{ chart.hideLoading(); }}, 4000);
+                                }});
+                            }}
+                        }}
+                    }},
+                    {chart_options[1]}
+                    series: [{{ name: payload.columns[0], data: points(0, 0, levels[0].name.length) }}]
                 }});"""
 
             st.components.v1.html(
@@ -237,5 +510,14 @@ if uploaded_file is not None:
                 """,
                 height=600,
             )
+
+    # Timing panel: which pipeline stages ran and which came from the cache
+    with st.expander("Pipeline Timings"):
+        st.table(pd.DataFrame(
+            [
+                {"Stage": name, "Time (ms)": round(seconds * 1000, 2), "Cache": "computed" if computed else "hit"}
+                for name, seconds, computed in stage_timings
+            ]
+        ))
 else:
     st.warning("Please upload a CSV file to get started.")
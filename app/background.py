@@ -0,0 +1,65 @@
+"""
+Background callback support for slow Dash callbacks (uploads, map charts).
+
+When ``diskcache`` is installed, callbacks registered through
+``background_callback`` run as Dash background callbacks: each job executes
+in its own process managed by a local diskcache job queue, reports progress
+to the page and can be cancelled, while the web workers stay free for the
+interactive callbacks. Without diskcache the same callbacks run
+synchronously and progress updates are dropped.
+
+Because jobs run in separate processes, enabling background mode also turns
+on the disk tiers of the dataset and figure caches, so datasets and figures
+produced by a job are visible to the web process and later jobs.
+"""
+import functools
+import os
+import tempfile
+
+from dataset_cache import dataset_cache
+from figure_cache import figure_cache
+
+WORK_DIR = os.path.join(tempfile.gettempdir(), "dynamic_analytics")
+CACHE_DIR = os.environ.get("BACKGROUND_CACHE_DIR", os.path.join(WORK_DIR, "jobs"))
+
+try:
+    import diskcache
+    from dash import DiskcacheManager
+
+    background_manager = DiskcacheManager(diskcache.Cache(CACHE_DIR))
+except ImportError:
+    background_manager = None
+
+if background_manager is not None:
+    if not dataset_cache.spill_dir:
+        dataset_cache.spill_dir = os.path.join(WORK_DIR, "datasets")
+    if not figure_cache.directory:
+        figure_cache.directory = os.path.join(WORK_DIR, "figures")
+        os.makedirs(figure_cache.directory, exist_ok=True)
+
+
+def background_callback(app, *args, progress=None, cancel=None, running=None, **kwargs):
+    """
+    ``app.callback`` variant for long-running callbacks.
+
+    The decorated function receives ``set_progress`` as its first argument,
+    as Dash background callbacks do; it is a no-op in synchronous mode.
+    """
+    def decorator(func):
+        if background_manager is None:
+            @functools.wraps(func)
+            def synchronous(*callback_args):
+                return func(lambda *_: None, *callback_args)
+
+            return app.callback(*args, **kwargs)(synchronous)
+        return app.callback(
+            *args,
+            background=True,
+            manager=background_manager,
+            progress=progress,
+            cancel=cancel,
+            running=running,
+            **kwargs,
+        )(func)
+
+    return decorator
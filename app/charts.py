@@ -0,0 +1,199 @@
+"""
+Chart specs and figure construction for the Dash dashboard.
+
+A chart spec is a plain dict describing one chart (type, axes, color,
+template, scoping filter and, for line charts, resampling).
+``make_chart_spec`` normalizes the sidebar values so that equivalent
+selections produce identical specs, and
+``build_figure`` turns a spec plus the dataset into a Plotly figure using the
+builder registered for its chart type. Plotly itself is imported when the
+first figure is built, not when the app starts.
+"""
+from column_index import ColumnIndex
+from downsampling import RENDER_BUDGET, Reduction, annotate_reduction, reduce_for_chart
+from geocoding import get_geocoder
+from time_series import RESAMPLE_LABELS, is_time_axis, resample_frame, resample_step, restrict_order
+from time_series import time_order as order_by_time
+
+DEFAULT_TEMPLATE = "plotly_dark"
+
+# Spec fields each chart type actually uses; the rest are dropped when normalizing.
+# Filled in by ``register_chart`` together with the builder registry.
+CHART_FIELDS = {}
+_BUILDERS = {}
+
+
+def register_chart(chart_type, fields):
+    """
+    Register ``builder(df, spec, progress)`` as the figure builder of a chart type.
+    """
+    def decorator(builder):
+        CHART_FIELDS[chart_type] = fields
+        _BUILDERS[chart_type] = builder
+        return builder
+
+    return decorator
+
+
+def _px():
+    # Plotly Express takes a large share of start-up time; load it with the first figure
+    import plotly.express as px
+
+    return px
+
+
+def make_chart_spec(
+    chart_type, x=None, y=None, color=None, template=None, filter_column=None, filter_values=None, resample=None
+):
+    """
+    Build a normalized chart spec from the sidebar selections.
+
+    ``resample`` ("auto", "none", "minute", "hour" or "day") only applies to
+    line charts and defaults to "auto".
+    """
+    fields = CHART_FIELDS.get(chart_type, ())
+    values = {"x": x, "y": y, "color": color}
+    spec = {"chart_type": chart_type, "template": template or DEFAULT_TEMPLATE}
+    spec.update({name: values[name] if name in fields else None for name in values})
+    if chart_type == "line":
+        spec["resample"] = resample or "auto"
+    if filter_column and filter_values:
+        spec["filter_column"] = filter_column
+        spec["filter_values"] = sorted(set(filter_values), key=str)
+    else:
+        spec["filter_column"] = None
+        spec["filter_values"] = None
+    return spec
+
+
+def apply_scope_filter(df, spec, column_index=None):
+    """
+    Restrict ``df`` to the rows selected by the spec's scoping filter.
+
+    Pass the dataset's ``ColumnIndex`` for the filter column to select rows by
+    lookup; without one a temporary index is built from the column.
+    """
+    if not (spec.get("filter_column") and spec.get("filter_values")):
+        return df
+    if column_index is None:
+        column_index = ColumnIndex(df[spec["filter_column"]])
+    return df.iloc[column_index.rows_for(spec["filter_values"])]
+
+
+def time_ordered(df, spec, column_index=None, order=None):
+    """
+    Scope-filtered rows of ``df`` in time order of the spec's datetime x column.
+
+    ``order`` is the dataset's cached ``time_order`` of that column; the scoping
+    filter only removes positions from it, so the rows are never re-sorted.
+    """
+    if order is None:
+        order = order_by_time(df[spec["x"]])
+    if spec.get("filter_column") and spec.get("filter_values"):
+        if column_index is None:
+            column_index = ColumnIndex(df[spec["filter_column"]])
+        order = restrict_order(order, column_index.rows_for(spec["filter_values"]), len(df))
+    return df.iloc[order]
+
+
+def build_figure(df, spec, column_index=None, progress=None, time_order=None):
+    """
+    Build the Plotly figure for a spec, or return None if nothing can be drawn.
+
+    ``progress(done, total)``, if given, receives geocoding progress for maps.
+    Line charts over a datetime x use ``time_order`` (see ``get_time_order``)
+    to put the rows in time order, or sort them here without one.
+    """
+    builder = _BUILDERS.get(spec["chart_type"])
+    if builder is None:
+        return None
+    if spec["chart_type"] == "line" and spec["x"] and is_time_axis(df[spec["x"]]):
+        return builder(time_ordered(df, spec, column_index, time_order), spec, progress)
+    return builder(apply_scope_filter(df, spec, column_index), spec, progress)
+
+
+@register_chart("scatter", ("x", "y", "color"))
+def _scatter(df, spec, progress):
+    # Reduce large data to the render budget before plotting
+    df, reduction = reduce_for_chart(df, "scatter", spec["x"], spec["y"], spec["color"])
+    fig = _px().scatter(
+        df,
+        x=spec["x"],
+        y=spec["y"],
+        color=spec["color"],
+        template=spec["template"],
+        **reduction.plot_kwargs,
+    )
+    return annotate_reduction(fig, reduction)
+
+
+@register_chart("bar", ("x", "y", "color"))
+def _bar(df, spec, progress):
+    return _px().bar(df, x=spec["x"], y=spec["y"], color=spec["color"], template=spec["template"])
+
+
+@register_chart("line", ("x", "y", "color"))
+def _line(df, spec, progress):
+    x, y, color = spec["x"], spec["y"], spec["color"]
+    step = resample_step(df, x, y, spec.get("resample"), RENDER_BUDGET)
+    resampled = None
+    if step:
+        resampled = Reduction(RESAMPLE_LABELS[step], len(df))
+        df = resample_frame(df, x, y, color, step)
+        resampled.rows_out = len(df)
+    # Whatever is still over the budget (raw rows or a fine step) goes through LTTB
+    df, reduction = reduce_for_chart(df, "line", x, y, color)
+    if resampled is not None:
+        if reduction.applied:
+            resampled.method = f"{resampled.method} + {reduction.method}"
+            resampled.rows_out = reduction.rows_out
+        reduction = resampled
+    fig = _px().line(
+        df,
+        x=x,
+        y=y,
+        color=color,
+        template=spec["template"],
+        render_mode="webgl" if reduction.applied else "auto",
+    )
+    return annotate_reduction(fig, reduction)
+
+
+@register_chart("pie", ("x", "y"))
+def _pie(df, spec, progress):
+    return _px().pie(df, names=spec["x"], values=spec["y"], template=spec["template"])
+
+
+@register_chart("map", ("y", "color"))
+def _map(df, spec, progress):
+    # Add latitude and longitude for cities (geocodes each distinct city once)
+    df = get_geocoder().add_coordinates(df, "City", progress=progress)
+    df = df.dropna(subset=["lat", "lon"])  # Drop rows with missing coordinates
+
+    if df.empty:
+        print("No valid coordinates found for the selected data.")
+        return None
+
+    df, reduction = reduce_for_chart(df, "map", y=spec["y"], color=spec["color"])
+
+    # Create map chart
+    fig = _px().scatter_geo(
+        df,
+        lat="lat",
+        lon="lon",
+        size=reduction.plot_kwargs.get("size", spec["y"]),
+        color=spec["color"],
+        template=spec["template"],
+        title="Map Visualization",
+    )
+    return annotate_reduction(fig, reduction)
+
+
+@register_chart("histogram", ("x", "color"))
+def _histogram(df, spec, progress):
+    return _px().histogram(df, x=spec["x"], color=spec["color"], template=spec["template"])
+
+
+@register_chart("box", ("x", "y", "color"))
+def _box(df, spec, progress):
+    return _px().box(df, x=spec["x"], y=spec["y"], color=spec["color"], template=spec["template"])
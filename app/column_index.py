@@ -0,0 +1,93 @@
+"""
+Per-dataset value index for the scoping filter.
+
+For a column, ``ColumnIndex`` holds the distinct values, their counts and the
+row positions of each value in CSR layout (one stable argsort of the factor
+codes plus offsets). Filter options come straight from the index, and
+selecting rows for a set of values only touches the selected rows instead of
+scanning the whole column with ``isin``.
+
+Option values keep their type (numbers stay numbers), so non-string columns
+match correctly.
+"""
+import numpy as np
+import pandas as pd
+
+from dataset_cache import dataset_cache
+
+# Option value standing in for missing entries, which JSON cannot key on
+MISSING_TOKEN = "__missing__"
+MISSING_LABEL = "(missing)"
+
+
+def option_value(value):
+    """
+    Convert a column value to the JSON-safe scalar used as its filter option value.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return MISSING_TOKEN
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+class ColumnIndex:
+    """
+    Distinct values, counts and row positions for one column.
+    """
+
+    def __init__(self, series):
+        codes, uniques = pd.factorize(series, sort=False)
+        n_values = len(uniques)
+        # Missing entries (code -1) get their own trailing slot
+        has_missing = bool((codes < 0).any())
+        codes = np.where(codes < 0, n_values, codes)
+        slots = n_values + int(has_missing)
+
+        self.values = [option_value(value) for value in uniques]
+        if has_missing:
+            self.values.append(MISSING_TOKEN)
+        self.counts = np.bincount(codes, minlength=slots)
+        self.order = np.argsort(codes, kind="stable")
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self._slot = {value: slot for slot, value in enumerate(self.values)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def options(self):
+        """
+        Checklist/Dropdown options in first-appearance order, with row counts.
+        """
+        return [
+            {
+                "label": f"{MISSING_LABEL if value == MISSING_TOKEN else value} ({count:,})",
+                "value": value,
+            }
+            for value, count in zip(self.values, self.counts.tolist())
+        ]
+
+    def rows_for(self, selected):
+        """
+        Sorted row positions whose value is one of ``selected`` option values.
+        """
+        slots = sorted({self._slot[value] for value in selected if value in self._slot})
+        if not slots:
+            return np.empty(0, dtype=np.int64)
+        parts = [self.order[self.offsets[slot]:self.offsets[slot + 1]] for slot in slots]
+        return np.sort(np.concatenate(parts))
+
+
+def get_column_index(dataset_key, column):
+    """
+    Index for a column of a cached dataset, built on first use and kept with the dataset.
+    """
+    return dataset_cache.derived(
+        dataset_key, ("column_index", column), lambda df: ColumnIndex(df[column]), persist=True
+    )
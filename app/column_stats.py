@@ -0,0 +1,250 @@
+"""
+Per-column statistics computed once per dataset at ingest.
+
+``profile_frame`` makes one vectorized pass per column and records its null
+count, distinct count, min/max, quartiles and most frequent values. Columns
+longer than ``EXACT_LIMIT`` rows use estimates instead of exact figures:
+
+* distinct counts of numeric and date columns come from a HyperLogLog
+  sketch over the column's 64-bit value hashes (about 1% relative error),
+  and their value counts are skipped when the column is near-unique;
+* quantiles come from a fixed-size uniform sample of the column (rank error
+  around 0.5%).
+
+The profile is cached with the dataset (``get_column_stats``) and feeds the
+analytics summary, filter slider bounds and options, and chart defaults, so
+none of those rescan the data.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import dataset_cache
+
+# Columns up to this many rows get exact distinct counts and quantiles
+EXACT_LIMIT = 200_000
+# Rows sampled for quantile estimates on longer columns
+QUANTILE_SAMPLE_SIZE = 50_000
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+TOP_K = 10
+# Columns with at most this many distinct values keep their full value list
+VALUES_LIMIT = 1_000
+# HyperLogLog precision: 2**14 registers
+HLL_PRECISION = 14
+# An estimated distinct count within this fraction of the non-null rows may be an ID column
+ID_LIKE_RATIO = 0.9
+
+
+def _bit_length(values):
+    """
+    Exact bit length of each element of a uint64 array.
+    """
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= np.uint64(1 << shift)
+        length[wide] += shift
+        values[wide] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+def hll_distinct(series, precision=HLL_PRECISION):
+    """
+    HyperLogLog estimate of the number of distinct non-null values in a column.
+    """
+    hashes = pd.util.hash_pandas_object(series.dropna(), index=False).to_numpy()
+    if not len(hashes):
+        return 0
+    m = 1 << precision
+    suffix_bits = 64 - precision
+    registers = np.zeros(m, dtype=np.int64)
+    buckets = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+    # Rank: position of the first set bit in the remaining suffix_bits bits
+    ranks = suffix_bits - _bit_length(hashes & np.uint64((1 << suffix_bits) - 1)) + 1
+    np.maximum.at(registers, buckets, ranks)
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int((registers == 0).sum())
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction: linear counting
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+@dataclass
+class ColumnStats:
+    """
+    Statistics of one column; ``values`` lists every distinct value for low-cardinality columns.
+    """
+    name: str
+    dtype: str
+    kind: str
+    count: int = 0
+    nulls: int = 0
+    distinct: int = 0
+    distinct_estimated: bool = False
+    min: object = None
+    max: object = None
+    quantiles: dict = field(default_factory=dict)
+    quantiles_estimated: bool = False
+    top: list = field(default_factory=list)
+    values: list = None
+
+    def summary_row(self):
+        """
+        Display row for the analytics summary table.
+        """
+        approx = "~" if self.distinct_estimated else ""
+        median = self.quantiles.get(0.5)
+        return {
+            "Column": self.name,
+            "Type": self.dtype,
+            "Nulls": f"{self.nulls:,}",
+            "Distinct": f"{approx}{self.distinct:,}",
+            "Min": _format(self.min),
+            "Median": _format(median),
+            "Max": _format(self.max),
+            "Top values": ", ".join(f"{_format(value)} ({count:,})" for value, count in self.top[:3]),
+        }
+
+
+def _format(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:,.4g}"
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+def _kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "categorical"
+    return "text"
+
+
+def _scalar(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def profile_column(series, name=None):
+    """
+    Statistics of one column (see the module docstring for which are estimated).
+    """
+    kind = _kind(series)
+    stats = ColumnStats(name=str(series.name if name is None else name), dtype=str(series.dtype), kind=kind)
+    stats.count = len(series)
+    stats.nulls = int(series.isna().sum())
+    large = len(series) > EXACT_LIMIT
+
+    if kind in ("numeric", "datetime"):
+        stats.min = _scalar(series.min())
+        stats.max = _scalar(series.max())
+        non_null = series.dropna()
+        if len(non_null):
+            if kind == "datetime":
+                values = non_null.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            else:
+                values = non_null.to_numpy(dtype=np.float64)
+            if len(values) > QUANTILE_SAMPLE_SIZE and large:
+                rng = np.random.default_rng(0)
+                values = values[rng.choice(len(values), QUANTILE_SAMPLE_SIZE, replace=False)]
+                stats.quantiles_estimated = True
+            points = np.quantile(values, QUANTILES)
+            if kind == "datetime":
+                points = [pd.Timestamp(int(point)) for point in points]
+            else:
+                points = [float(point) for point in points]
+            stats.quantiles = dict(zip(QUANTILES, points))
+
+    if kind == "categorical":
+        # Counts per category come from the codes without hashing the values
+        counts = series.value_counts(sort=True)
+        counts = counts[counts > 0]
+        stats.distinct = len(counts)
+    elif large and kind in ("numeric", "datetime"):
+        # Top values of a near-unique measure say nothing; only count values when there are few
+        stats.distinct = hll_distinct(series)
+        stats.distinct_estimated = True
+        counts = None
+        if stats.distinct <= VALUES_LIMIT * 10:
+            counts = series.value_counts(sort=True)
+            stats.distinct = len(counts)
+            stats.distinct_estimated = False
+    else:
+        # Text needs the value counts for its top values anyway, which also give the exact count
+        counts = series.value_counts(sort=True)
+        stats.distinct = len(counts)
+
+    if counts is not None:
+        stats.top = [(_scalar(value), int(count)) for value, count in counts.head(TOP_K).items()]
+        if len(counts) <= VALUES_LIMIT:
+            stats.values = [_scalar(value) for value in counts.index]
+    return stats
+
+
+def profile_frame(df):
+    """
+    ``{column: ColumnStats}`` for every column of ``df``.
+    """
+    return {col: profile_column(df[col], col) for col in df.columns}
+
+
+def get_column_stats(dataset_key):
+    """
+    Column statistics of a cached dataset, computed on first use and cached with it.
+    """
+    return dataset_cache.derived(dataset_key, "column_stats", profile_frame, persist=True)
+
+
+def summary_frame(stats):
+    """
+    One display row per column, for the analytics summary.
+    """
+    return pd.DataFrame([column.summary_row() for column in stats.values()])
+
+
+def numeric_columns(stats):
+    return [name for name, column in stats.items() if column.kind == "numeric"]
+
+
+def _id_like_threshold(column):
+    non_null = column.count - column.nulls
+    return non_null * ID_LIKE_RATIO if column.distinct_estimated else non_null
+
+
+def chart_defaults(stats):
+    """
+    Default x and y axis columns: a low-cardinality or date column against a measure.
+    """
+    x = next(
+        (name for name, column in stats.items() if column.kind == "datetime"),
+        None,
+    ) or next(
+        (
+            name for name, column in stats.items()
+            if column.kind in ("categorical", "text", "bool") and 1 < column.distinct <= 50
+        ),
+        None,
+    )
+    # Prefer a measure over an ID-like column, which has one distinct value per row;
+    # a HyperLogLog estimate can fall just under the row count, so it needs a margin
+    measures = [
+        name for name, column in stats.items()
+        if column.kind == "numeric" and name != x and column.distinct < _id_like_threshold(column)
+    ]
+    y = measures[0] if measures else next((name for name in numeric_columns(stats) if name != x), None)
+    return x, y
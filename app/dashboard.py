@@ -0,0 +1,178 @@
+"""
+Parallel figure building for multi-chart dashboards.
+
+A dashboard is a list of chart specs rendered concurrently in a process pool,
+since figure building is CPU-bound pandas/Plotly work that threads cannot
+parallelize. The dataset is exported once as an Arrow IPC file; workers
+memory-map it and keep the loaded frame between tasks, so a dataset crosses
+the process boundary once per worker rather than once per chart.
+
+Jobs are tracked server-side and polled by the page, which appends each chart
+as soon as its figure is ready. Finished figures are also written to the
+figure cache, so when several web worker processes share its disk tier a poll
+landing on a worker other than the one that started the job still finds them
+(``collect_cached``).
+"""
+import functools
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+
+from charts import build_figure
+from disk_sweep import sweep, touch
+from figure_cache import figure_cache, figure_key
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "dynamic_analytics")
+# Disk budget of the dataset exports, swept least recently used first
+EXPORT_MAX_BYTES = int(os.environ.get("DASHBOARD_EXPORT_MAX_BYTES", 8 * 1024 ** 3))
+MAX_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", os.cpu_count() or 2))
+# Seconds after which a poll stops waiting for the charts of a job
+JOB_TIMEOUT = int(os.environ.get("DASHBOARD_TIMEOUT", "600"))
+# Datasets each worker keeps loaded between tasks
+WORKER_FRAME_CACHE = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# Worker-process state: Arrow export path -> DataFrame
+_worker_frames = {}
+
+
+def export_dataset(df, fingerprint):
+    """
+    Write ``df`` as an Arrow IPC file named by its fingerprint (once) and return the path.
+    """
+    import pyarrow as pa
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"{fingerprint}.arrow")
+    if not os.path.exists(path):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        sweep(EXPORT_DIR, EXPORT_MAX_BYTES, suffixes=(".arrow", ".tmp"))
+    else:
+        touch(path)
+    return path
+
+
+def _load_frame(path):
+    import pyarrow as pa
+
+    df = _worker_frames.get(path)
+    if df is None:
+        with pa.memory_map(path, "r") as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas()
+        while len(_worker_frames) >= WORKER_FRAME_CACHE:
+            _worker_frames.pop(next(iter(_worker_frames)))
+        _worker_frames[path] = df
+    return df
+
+
+def render_chart(path, spec):
+    """
+    Worker task: build one figure from the exported dataset and return its JSON.
+    """
+    fig = build_figure(_load_frame(path), spec)
+    return None if fig is None else fig.to_json()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: forking a threaded web server process is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _store_figure(key, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    figure_json = future.result()
+    if figure_json is not None:
+        figure_cache.put_json(key, figure_json)
+
+
+def submit_dashboard(path, charts, fingerprint=None):
+    """
+    Start rendering ``charts`` (a list of ``(chart_id, spec)``) and return a job ID.
+
+    With the dataset ``fingerprint``, each figure is added to the figure cache as it finishes.
+    """
+    pool = get_pool()
+    job_id = uuid.uuid4().hex
+    entries = []
+    for chart_id, spec in charts:
+        future = pool.submit(render_chart, path, spec)
+        if fingerprint is not None:
+            future.add_done_callback(functools.partial(_store_figure, figure_key(fingerprint, spec)))
+        entries.append((chart_id, spec, future))
+    with _jobs_lock:
+        _jobs[job_id] = entries
+    return job_id
+
+
+def owns_job(job_id):
+    """
+    Whether the job is running in this process.
+    """
+    with _jobs_lock:
+        return job_id in _jobs
+
+
+def collect_finished(job_id):
+    """
+    Pop the charts of a job that have finished since the last call.
+
+    Returns ``(finished, remaining)`` where ``finished`` is a list of
+    ``(chart_id, spec, figure_json_or_None)``; failed charts come back as None.
+    """
+    with _jobs_lock:
+        pending = _jobs.get(job_id, [])
+        done = [entry for entry in pending if entry[2].done()]
+        remaining = [entry for entry in pending if not entry[2].done()]
+        if remaining:
+            _jobs[job_id] = remaining
+        else:
+            _jobs.pop(job_id, None)
+
+    finished = []
+    for chart_id, spec, future in done:
+        try:
+            finished.append((chart_id, spec, future.result()))
+        except Exception as e:
+            print(f"Error generating chart: {e}")
+            finished.append((chart_id, spec, None))
+    return finished, len(remaining)
+
+
+def collect_cached(charts, fingerprint):
+    """
+    Charts of a job owned by another process whose figures are in the figure cache.
+
+    Returns a list of ``(chart_id, spec, figure_dict)`` for the entries of
+    ``charts`` (``(chart_id, spec)`` pairs) that are ready.
+    """
+    finished = []
+    for chart_id, spec in charts:
+        figure = figure_cache.get(figure_key(fingerprint, spec))
+        if figure is not None:
+            finished.append((chart_id, spec, figure))
+    return finished
+
+
+def cancel_dashboard(job_id):
+    with _jobs_lock:
+        for _, _, future in _jobs.pop(job_id, []):
+            future.cancel()
@@ -0,0 +1,212 @@
+"""
+Server-side data sources: files and partitioned directories under ``data/``.
+
+Instead of uploading through the browser, a dataset can be opened from the
+``data/raw`` and ``data/processed`` directories that template.py scaffolds
+(override with ``DATA_SOURCE_DIRS``, a path-separated list). A source is a
+single file or a directory whose files are partitions of one dataset.
+
+Arrow IPC/Feather and Parquet partitions are read memory-mapped, CSV
+partitions go through the upload parser. Each partition is remembered with
+its modification time and size; ``LocalSource.refresh`` only stats the files
+and re-reads the partitions that were added or changed, so watching a source
+by polling is cheap and a changed partition never re-parses the others.
+"""
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from ingest import COLUMNAR_FORMATS, CSV_COMPRESSION, detect_format, optimize_dtypes, read_csv_bytes
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIRS = [os.path.join(PROJECT_ROOT, "data", "raw"), os.path.join(PROJECT_ROOT, "data", "processed")]
+SOURCE_DIRS = [
+    path for path in os.environ.get("DATA_SOURCE_DIRS", "").split(os.pathsep) if path
+] or DEFAULT_DIRS
+# File extensions that are read as partitions; other files are ignored
+SOURCE_EXTENSIONS = (".csv", ".csv.gz", ".csv.zst", ".parquet", ".feather", ".arrow", ".ipc")
+
+
+def _is_data_file(name):
+    return name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith(".")
+
+
+def list_sources(directories=None):
+    """
+    Paths of the files and partition directories that can be opened, sorted.
+    """
+    sources = []
+    for directory in directories or SOURCE_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                if any(_is_data_file(child) for child in os.listdir(path)):
+                    sources.append(path)
+            elif _is_data_file(name):
+                sources.append(path)
+    return sources
+
+
+def source_label(path):
+    """
+    Short display name of a source, relative to the project root.
+    """
+    return os.path.relpath(path, PROJECT_ROOT)
+
+
+def is_allowed_source(path):
+    """
+    Whether ``path`` lies inside one of the configured source directories.
+    """
+    real = os.path.realpath(path)
+    return any(
+        os.path.commonpath([real, os.path.realpath(directory)]) == os.path.realpath(directory)
+        for directory in SOURCE_DIRS
+    )
+
+
+def read_partition(path):
+    """
+    Read one data file; Arrow/Feather and Parquet files are memory-mapped.
+    """
+    with open(path, "rb") as f:
+        head = f.read(8)
+    fmt = detect_format(head)
+    if fmt in ("arrow", "feather"):
+        from pyarrow import feather
+
+        return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+    if fmt in COLUMNAR_FORMATS:
+        import pyarrow as pa
+
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_stream(source).read_all().to_pandas(split_blocks=True)
+    with open(path, "rb") as f:
+        data, _ = read_csv_bytes(f.read(), compression=CSV_COMPRESSION[fmt])
+    optimize_dtypes(data)
+    return data
+
+
+class LocalSource:
+    """
+    A file or partition directory, re-read incrementally as its files change.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._partitions = {}  # file path -> ((mtime_ns, size), DataFrame)
+        self._frame = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _files(self):
+        if os.path.isdir(self.path):
+            return sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path) if _is_data_file(name)
+            )
+        return [self.path] if os.path.exists(self.path) else []
+
+    def _stat(self):
+        stats = {}
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Removed between listing and stat
+                continue
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    @staticmethod
+    def _sign(stats):
+        hasher = hashlib.blake2b(digest_size=16)
+        for path, (mtime, size) in sorted(stats.items()):
+            hasher.update(f"{path}|{mtime}|{size}\n".encode())
+        return hasher.hexdigest()
+
+    def changed(self):
+        """
+        Whether any partition was added, removed or modified since the last load (stat only).
+        """
+        return self._sign(self._stat()) != self._signature
+
+    @property
+    def signature(self):
+        """
+        Hash of the partition files' paths, modification times and sizes at the last load.
+        """
+        return self._signature
+
+    def refresh(self):
+        """
+        Bring the frame up to date; returns the partition paths that were (re)read.
+        """
+        with self._lock:
+            stats = self._stat()
+            signature = self._sign(stats)
+            if signature == self._signature:
+                return []
+            reloaded = []
+            partitions = {}
+            for path, stat in stats.items():
+                known = self._partitions.get(path)
+                if known is not None and known[0] == stat:
+                    partitions[path] = known
+                    continue
+                try:
+                    partitions[path] = (stat, read_partition(path))
+                    reloaded.append(path)
+                except Exception as e:
+                    # A partition being written may not parse yet; keep the old copy for now
+                    print(f"Error reading partition {path}: {e}")
+                    if known is not None:
+                        partitions[path] = known
+                    stats[path] = known[0] if known is not None else None
+            self._partitions = partitions
+            frames = [frame for _, frame in partitions.values()]
+            if not frames:
+                self._frame = pd.DataFrame()
+            elif len(frames) == 1:
+                self._frame = frames[0]
+            else:
+                self._frame = pd.concat(frames, ignore_index=True)
+            self._signature = self._sign({path: stat for path, stat in stats.items() if stat is not None})
+            return reloaded
+
+    def load(self):
+        """
+        The current frame, refreshing changed partitions first.
+        """
+        self.refresh()
+        return self._frame
+
+    @property
+    def dataset_key(self):
+        """
+        Dataset cache key of the current version; it changes whenever a partition does.
+        """
+        return f"source-{self._signature}"
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def get_source(path):
+    """
+    The process-wide ``LocalSource`` for ``path``, so partitions are shared between callers.
+    """
+    path = os.path.abspath(path)
+    with _sources_lock:
+        source = _sources.get(path)
+        if source is None:
+            source = _sources[path] = LocalSource(path)
+        return source
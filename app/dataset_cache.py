@@ -0,0 +1,260 @@
+"""
+Server-side registry for uploaded datasets.
+
+Parsed DataFrames are kept in process memory and addressed by an upload key,
+so the browser-side ``dcc.Store`` only has to carry the key instead of every
+record. Entries are evicted least-recently-used first once either the entry
+limit or the byte budget is exceeded.
+
+With a spill directory configured (``DATASET_SPILL_DIR``), every registered
+frame is also written as an Arrow IPC (Feather) file and a key missing from
+memory is reloaded from disk, memory-mapped. This lets other processes, such
+as background callback jobs, register and resolve datasets. Derived artifacts
+requested with ``persist`` (fingerprint, column indexes and statistics, time
+orders) are written next to the frame, so each is computed once for all
+processes. Spilled files outlive the in-memory entry, since other processes
+may still use them; the directory is instead swept down to
+``DATASET_SPILL_MAX_BYTES``, least recently used first.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from disk_sweep import sweep, touch
+
+# Defaults sized for a single dashboard process
+DEFAULT_MAX_ITEMS = 16
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+DATASET_SPILL_DIR = os.environ.get("DATASET_SPILL_DIR")
+# Disk budget of the spill directory, swept least recently used first (see disk_sweep.py)
+DATASET_SPILL_MAX_BYTES = int(os.environ.get("DATASET_SPILL_MAX_BYTES", 8 * 1024 ** 3))
+
+
+def frame_nbytes(df):
+    """
+    Estimate the in-memory size of a DataFrame, including object payloads.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def frame_fingerprint(df):
+    """
+    Content hash of a DataFrame's columns, dtypes and values (index ignored).
+    """
+    hasher = hashlib.sha256()
+    hasher.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+class _Entry:
+    __slots__ = ("frame", "nbytes", "meta")
+
+    def __init__(self, frame, nbytes):
+        self.frame = frame
+        self.nbytes = nbytes
+        # Derived, per-dataset artifacts (fingerprint, indexes, ...)
+        self.meta = {}
+
+
+class DatasetCache:
+    """
+    Thread-safe LRU cache of DataFrames bounded by entry count and total bytes.
+
+    Frames are returned as-is (no copy), so callers must treat them as
+    read-only and copy before mutating.
+    """
+
+    def __init__(
+        self,
+        max_items=DEFAULT_MAX_ITEMS,
+        max_bytes=DEFAULT_MAX_BYTES,
+        spill_dir=DATASET_SPILL_DIR,
+        spill_max_bytes=DATASET_SPILL_MAX_BYTES,
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self._entries = OrderedDict()  # key -> _Entry
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    def put(self, df, key=None):
+        """
+        Register a DataFrame and return the key that resolves it.
+        """
+        key = key or uuid.uuid4().hex
+        if self.spill_dir:
+            self._spill(key, df)
+        self._remember(key, df)
+        return key
+
+    def _remember(self, key, df):
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key).nbytes
+            self._entries[key] = _Entry(df, nbytes)
+            self._total_bytes += nbytes
+            self._evict()
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.arrow")
+
+    def _derived_files(self, key):
+        pattern = os.path.join(glob.escape(self.spill_dir), f"{glob.escape(key)}.*")
+        return [path for path in glob.glob(pattern) if path.endswith((".npy", ".pkl"))]
+
+    def _spill(self, key, df):
+        from pyarrow import feather
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # Artifacts derived from a previous frame under this key no longer apply
+        for path in self._derived_files(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        tmp_path = f"{self._spill_path(key)}.{os.getpid()}.tmp"
+        try:
+            feather.write_feather(df, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, self._spill_path(key))
+        except Exception as e:
+            print(f"Error spilling dataset {key} to disk: {e}")
+        sweep(self.spill_dir, self.spill_max_bytes)
+
+    def _load_spilled(self, key):
+        path = self._spill_path(key)
+        if not os.path.exists(path):
+            return None
+        from pyarrow import feather
+
+        touch(path)
+        df = feather.read_feather(path, memory_map=True)
+        self._remember(key, df)
+        return df
+
+    def get(self, key):
+        """
+        Resolve a key to its DataFrame, or None if unknown or evicted.
+        """
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            if self.spill_dir:
+                # Keeps the spilled copy recent for the sweep while this process uses it
+                touch(self._spill_path(key))
+            return entry.frame
+        if self.spill_dir:
+            return self._load_spilled(key)
+        return None
+
+    def _derived_path(self, key, name, suffix):
+        digest = hashlib.blake2b(repr(name).encode(), digest_size=8).hexdigest()
+        return os.path.join(self.spill_dir, f"{key}.{digest}{suffix}")
+
+    def _load_derived(self, key, name, compute, frame):
+        # Artifacts persisted next to the spill file are shared with other processes:
+        # numpy arrays as memory-mapped .npy files, anything else pickled
+        array_path = self._derived_path(key, name, ".npy")
+        pickle_path = self._derived_path(key, name, ".pkl")
+        if os.path.exists(array_path):
+            touch(array_path)
+            return np.load(array_path, mmap_mode="r")
+        if os.path.exists(pickle_path):
+            touch(pickle_path)
+            try:
+                with open(pickle_path, "rb") as f:
+                    return pickle.load(f)
+            except Exception as e:
+                print(f"Error loading {name} of dataset {key} from disk: {e}")
+        value = compute(frame)
+        is_array = isinstance(value, np.ndarray)
+        path = array_path if is_array else pickle_path
+        tmp_path = f"{path}.{os.getpid()}.tmp{'.npy' if is_array else ''}"
+        try:
+            if is_array:
+                np.save(tmp_path, value)
+            else:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error spilling {name} of dataset {key} to disk: {e}")
+        return value
+
+    def derived(self, key, name, compute, persist=False):
+        """
+        Return a per-dataset artifact, computing it from the frame on first use.
+
+        ``compute(frame)`` runs at most once per key and name while the dataset is
+        cached; the result is dropped together with the dataset on eviction.
+        With ``persist`` and a spill directory, the result is also written next
+        to the spilled frame and reused by other processes, such as background
+        jobs, instead of being recomputed in each of them.
+        """
+        if self.get(key) is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if name in entry.meta:
+                return entry.meta[name]
+            frame = entry.frame
+        if persist and self.spill_dir:
+            value = self._load_derived(key, name, compute, frame)
+        else:
+            value = compute(frame)
+        with self._lock:
+            return entry.meta.setdefault(name, value)
+
+    def fingerprint(self, key):
+        """
+        Content hash of a cached dataset, or None if the key is unknown.
+        """
+        return self.derived(key, "fingerprint", frame_fingerprint, persist=True)
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry.nbytes
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(key) and bool(self.spill_dir) and os.path.exists(self._spill_path(key))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_items or self._total_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.nbytes
+
+
+# Process-wide registry shared by all callbacks
+dataset_cache = DatasetCache()
@@ -0,0 +1,81 @@
+"""
+Size and age caps for the on-disk cache directories.
+
+Spilled datasets, persisted figures, dashboard exports and Parquet copies are
+shared by several processes and outlive any one of them, so they are not
+deleted when an in-memory tier evicts its entry. Instead each writer calls
+``sweep`` after adding a file: files older than the age cap are removed, then
+the least recently used ones until the directory fits its byte budget.
+Readers ``touch`` the files they use, so recency reflects access rather than
+creation.
+"""
+import os
+import threading
+import time
+
+# Files unused for this long are removed regardless of the byte budget
+DEFAULT_MAX_AGE = float(os.environ.get("DISK_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+# Minimum seconds between two sweeps of the same directory
+SWEEP_INTERVAL = 60.0
+
+_last_sweep = {}
+_lock = threading.Lock()
+
+
+def touch(path):
+    """
+    Mark a cached file as used now.
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def sweep(directory, max_bytes, max_age=DEFAULT_MAX_AGE, suffixes=None, force=False):
+    """
+    Remove expired, then least recently used files from ``directory``; returns the removed paths.
+
+    Only files ending in one of ``suffixes`` are considered (all files if None).
+    Partially written ``.tmp`` files count towards the age cap only. Sweeps of
+    one directory are throttled to one per ``SWEEP_INTERVAL`` unless ``force``.
+    """
+    if not directory:
+        return []
+    now = time.time()
+    with _lock:
+        if not force and now - _last_sweep.get(directory, 0.0) < SWEEP_INTERVAL:
+            return []
+        _last_sweep[directory] = now
+
+    files = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or (suffixes is not None and not entry.name.endswith(suffixes)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return []
+
+    removed = []
+    total = 0
+    # Newest first: keep files while they fit the budget, drop the rest
+    # (the newest file is always kept, like the in-memory tiers keep their newest entry)
+    for mtime, size, path in sorted(files, reverse=True):
+        temporary = ".tmp" in os.path.basename(path)
+        expired = now - mtime > max_age
+        over_budget = not temporary and total > 0 and total + size > max_bytes
+        if expired or over_budget:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+        elif not temporary:
+            total += size
+    return removed
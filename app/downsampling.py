@@ -0,0 +1,242 @@
+"""
+Render-budget reductions for large scatter, line and map charts.
+
+Plotly serializes every point into the figure JSON, so past a few tens of
+thousands of rows the browser spends its time parsing rather than drawing.
+``reduce_for_chart`` picks a reduction once the row count exceeds the budget:
+
+- line: Largest-Triangle-Three-Buckets (LTTB) per series for numeric or
+  datetime x, min/max decimation per bucket otherwise
+- scatter: WebGL rendering up to ``WEBGL_MAX_POINTS``, 2-D binning beyond that
+- map: spatial gridding into lat/lon cells
+
+The returned ``Reduction`` records what was applied so the chart can say so.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# Points per chart drawn as-is with SVG
+RENDER_BUDGET = 20_000
+# Scatter points drawn individually with WebGL before falling back to binning
+WEBGL_MAX_POINTS = 300_000
+# Bins per axis for 2-D scatter binning
+SCATTER_BINS = 200
+
+
+@dataclass
+class Reduction:
+    """
+    Description of the reduction applied to a chart's data.
+    """
+    method: str = "none"
+    rows_in: int = 0
+    rows_out: int = 0
+    plot_kwargs: dict = field(default_factory=dict)
+
+    @property
+    def applied(self):
+        return self.method != "none"
+
+    def note(self):
+        if self.method == "webgl":
+            return f"{self.rows_in:,} points rendered with WebGL"
+        return f"{self.method}: {self.rows_in:,} rows reduced to {self.rows_out:,} points"
+
+
+def _as_float(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]")
+        as_float = values.astype("int64").astype("float64")
+        as_float[np.isnat(values)] = np.nan
+        return as_float
+    return series.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _is_continuous(series):
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Return the positions kept by Largest-Triangle-Three-Buckets downsampling.
+
+    ``x`` must be sorted ascending; the first and last points are always kept.
+    The buckets are evaluated together rather than one by one: a first pass
+    anchors each bucket's triangles on the previous bucket's average, then
+    only buckets whose anchor (the point picked in the previous bucket)
+    changed are re-evaluated until none does. The result is the same as the
+    sequential algorithm's.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket i covers [bounds[i], bounds[i + 1]); the last "bucket" is the final point
+    bounds = np.concatenate([np.linspace(1, n - 1, n_out - 1).astype(np.int64), [n]])
+    counts = np.diff(bounds)
+    mean_x = np.add.reduceat(x, bounds[:-1]) / counts
+    mean_y = np.add.reduceat(y, bounds[:-1]) / counts
+    # Padded (bucket, offset) grid of row positions
+    offsets = np.arange(int(counts[:-1].max()))
+    valid = offsets[None, :] < counts[:-1, None]
+    rows = np.minimum(bounds[:-2, None] + offsets[None, :], n - 1)
+
+    def pick(buckets, anchor_x, anchor_y):
+        # Bucket point with the largest triangle against its anchor and the next bucket's average
+        bucket_x = x[rows[buckets]]
+        bucket_y = y[rows[buckets]]
+        next_x = mean_x[buckets + 1, None]
+        next_y = mean_y[buckets + 1, None]
+        anchor_x = anchor_x[:, None]
+        anchor_y = anchor_y[:, None]
+        areas = np.abs((anchor_x - next_x) * (bucket_y - anchor_y) - (anchor_x - bucket_x) * (next_y - anchor_y))
+        areas = np.where(valid[buckets] & np.isfinite(areas), areas, -np.inf)
+        # Buckets without a finite area keep their first point
+        return rows[buckets, np.argmax(areas, axis=1)]
+
+    n_buckets = n_out - 2
+    buckets = np.arange(n_buckets)
+    picked = pick(
+        buckets,
+        np.concatenate([[x[0]], mean_x[:n_buckets - 1]]),
+        np.concatenate([[y[0]], mean_y[:n_buckets - 1]]),
+    )
+    # Bucket 0 is anchored on the first point already; the others move to their real anchor
+    pending = buckets[1:]
+    while len(pending):
+        anchors = picked[pending - 1]
+        new = pick(pending, x[anchors], y[anchors])
+        changed = pending[new != picked[pending]]
+        picked[pending] = new
+        pending = changed[changed < n_buckets - 1] + 1
+    return np.concatenate([[0], picked, [n - 1]]).astype(np.int64)
+
+
+def minmax_indices(y, n_out):
+    """
+    Keep the minimum and maximum of each of ``n_out // 2`` buckets, in row order.
+    """
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    if n <= n_out:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    kept = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        segment = y[start:stop]
+        if not np.isfinite(segment).any():
+            continue
+        kept.extend(sorted({start + int(np.nanargmin(segment)), start + int(np.nanargmax(segment))}))
+    return np.asarray(kept, dtype=np.int64)
+
+
+def _reduce_line(df, x, y, color, budget):
+    groups = [frame for _, frame in df.groupby(color, sort=False, observed=True, dropna=False)] if color else [df]
+    per_series = max(3, budget // max(1, len(groups)))
+    continuous_x = _is_continuous(df[x])
+    method = "LTTB" if continuous_x else "min/max decimation"
+    parts = []
+    for frame in groups:
+        if continuous_x:
+            # Time-ordered input (see time_series.py) is already sorted
+            if not frame[x].is_monotonic_increasing:
+                frame = frame.sort_values(x, kind="stable")
+            positions = lttb_indices(_as_float(frame[x]), _as_float(frame[y]), per_series)
+        else:
+            positions = minmax_indices(_as_float(frame[y]), per_series)
+        parts.append(frame.iloc[positions])
+    return pd.concat(parts), method
+
+
+def _reduce_scatter_bins(df, x, y, color, bins):
+    keys = []
+    binned = {}
+    for axis in (x, y):
+        values = _as_float(df[axis])
+        edges = np.linspace(np.nanmin(values), np.nanmax(values), bins + 1)
+        index = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+        centers = (edges[:-1] + edges[1:]) / 2
+        binned[axis] = centers[index]
+        keys.append(axis)
+    frame = pd.DataFrame(binned, index=df.index)
+    if color:
+        frame[color] = df[color]
+        keys.append(color)
+    reduced = frame.groupby(keys, observed=True, dropna=True).size().reset_index(name="count")
+    for axis in (x, y):
+        if pd.api.types.is_datetime64_any_dtype(df[axis]):
+            reduced[axis] = pd.to_datetime(reduced[axis].astype("int64"))
+    return reduced
+
+
+def grid_geo(df, size, color, budget, lat="lat", lon="lon"):
+    """
+    Aggregate points into lat/lon grid cells, coarsening until under ``budget``.
+
+    ``size`` is summed per cell and a ``count`` column is added; cells are split
+    by ``color`` when given.
+    """
+    cell = 0.01
+    while True:
+        frame = pd.DataFrame({
+            lat: (df[lat] / cell).round() * cell,
+            lon: (df[lon] / cell).round() * cell,
+        })
+        keys = [lat, lon]
+        if color:
+            frame[color] = df[color]
+            keys.append(color)
+        aggregations = {"count": (lat, "size")}
+        if size:
+            frame[size] = df[size]
+            aggregations[size] = (size, "sum")
+        reduced = frame.groupby(keys, observed=True).agg(**aggregations).reset_index()
+        if len(reduced) <= budget or cell >= 10:
+            return reduced
+        cell *= 2
+
+
+def reduce_for_chart(df, chart_type, x=None, y=None, color=None, budget=RENDER_BUDGET):
+    """
+    Return ``(df, Reduction)`` with the data reduced to fit the render budget.
+
+    Frames under the budget, and chart types without a reduction, pass through.
+    """
+    reduction = Reduction(rows_in=len(df), rows_out=len(df))
+    if len(df) <= budget:
+        return df, reduction
+
+    if chart_type == "line" and x and y and pd.api.types.is_numeric_dtype(df[y]):
+        df, reduction.method = _reduce_line(df, x, y, color, budget)
+    elif chart_type == "scatter" and x and y:
+        if len(df) <= WEBGL_MAX_POINTS:
+            reduction.method = "webgl"
+            reduction.plot_kwargs = {"render_mode": "webgl"}
+        elif _is_continuous(df[x]) and _is_continuous(df[y]):
+            df = _reduce_scatter_bins(df, x, y, color, SCATTER_BINS)
+            reduction.method = "2-D binning"
+            reduction.plot_kwargs = {"size": "count"}
+        else:
+            reduction.method = "webgl"
+            reduction.plot_kwargs = {"render_mode": "webgl"}
+    elif chart_type == "map":
+        size = y if y and pd.api.types.is_numeric_dtype(df[y]) else None
+        df = grid_geo(df, size, color, budget)
+        reduction.method = "spatial gridding"
+        reduction.plot_kwargs = {"size": size or "count"}
+    reduction.rows_out = len(df)
+    return df, reduction
+
+
+def annotate_reduction(fig, reduction):
+    """
+    Add a subtitle to ``fig`` describing the reduction, if one was applied.
+    """
+    if not reduction.applied:
+        return fig
+    title = fig.layout.title.text or ""
+    subtitle = f"<sup>{reduction.note()}</sup>"
+    fig.update_layout(title_text=f"{title}<br>{subtitle}" if title else subtitle)
+    return fig
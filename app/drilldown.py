@@ -0,0 +1,206 @@
+"""
+Drill-down hierarchy builder for the Highcharts drill-down chart in app2.py.
+
+The data is grouped once by the full hierarchy; every coarser level is a
+vectorized roll-up of that leaf aggregate, which is far smaller than the raw
+rows. Node IDs are built column-wise and resolved through a dict, and the
+children of a node are a contiguous slice of the next level, so building the
+payload is linear in the number of groups.
+
+Levels are built on demand and cached on the tree, so callers that only need
+the expanded parts of the hierarchy can ask for just those. Missing keys are
+kept as their own ("nan") nodes so children always sum to their parent.
+
+``compact_payload`` is the format app2.py sends to the browser: one columnar
+record per level (names, values and child offsets) where a node is identified
+by its integer position in its level, instead of one dict with a long string
+ID per point. It is serialized with orjson when installed.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _path_ids(index, columns):
+    """
+    Drill-down IDs (``col_value_col_value...``) for every entry of a level index.
+    """
+    ids = None
+    for depth, column in enumerate(columns):
+        part = f"{column}_" + pd.Series(index.get_level_values(depth), dtype=object).astype(str)
+        ids = part if ids is None else ids + "_" + part
+    return ids.str.replace(" ", "_", regex=False).to_numpy()
+
+
+class DrilldownTree:
+    """
+    Aggregated drill-down hierarchy over ``drill_columns``.
+
+    Groups are sorted at every level, so the children of a node occupy one
+    contiguous block of the next level; ``_child_offsets`` locates that block.
+    """
+
+    def __init__(self, df, drill_columns, aggregation_column, leaf=None):
+        self.drill_columns = list(drill_columns)
+        self.aggregation_column = aggregation_column
+        # Single group-by over the full hierarchy; all other levels roll up from it
+        if leaf is None:
+            leaf = df.groupby(self.drill_columns, observed=True, dropna=False)[aggregation_column].sum()
+        self.leaf = leaf
+        self._levels = {}
+        self._points = {}
+        self._positions = {}
+        self._offsets = {}
+
+    @classmethod
+    def from_leaf(cls, leaf, drill_columns, aggregation_column):
+        """
+        Tree over an already aggregated leaf level (sums indexed by ``drill_columns``, sorted).
+        """
+        return cls(None, drill_columns, aggregation_column, leaf=leaf)
+
+    @property
+    def depth(self):
+        return len(self.drill_columns)
+
+    def level(self, depth):
+        """
+        Aggregate for the first ``depth + 1`` hierarchy columns.
+        """
+        if depth not in self._levels:
+            if depth == self.depth - 1:
+                self._levels[depth] = self.leaf
+            else:
+                self._levels[depth] = self.leaf.groupby(level=list(range(depth + 1)), observed=True, dropna=False).sum()
+        return self._levels[depth]
+
+    def points(self, depth):
+        """
+        ``(names, values, ids)`` arrays for every node of a level.
+        """
+        if depth not in self._points:
+            aggregate = self.level(depth)
+            names = pd.Series(aggregate.index.get_level_values(depth), dtype=object).astype(str).to_numpy()
+            values = aggregate.to_numpy(dtype="float64")
+            if depth < self.depth - 1:
+                ids = _path_ids(aggregate.index, self.drill_columns[:depth + 1])
+            else:
+                ids = np.full(len(aggregate), None, dtype=object)
+            self._points[depth] = (names, values, ids)
+        return self._points[depth]
+
+    def _node_positions(self, depth):
+        if depth not in self._positions:
+            self._positions[depth] = {node_id: position for position, node_id in enumerate(self.points(depth)[2])}
+        return self._positions[depth]
+
+    def _child_offsets(self, depth):
+        if depth not in self._offsets:
+            sizes = self.level(depth + 1).groupby(level=list(range(depth + 1)), observed=True, dropna=False).size()
+            self._offsets[depth] = np.concatenate([[0], np.cumsum(sizes.to_numpy())])
+        return self._offsets[depth]
+
+    def level_arrays(self, depth):
+        """
+        Columnar record of a level: node names, values and, above the leaves,
+        the offsets of each node's children in the next level.
+        """
+        names, values, _ = self.points(depth)
+        record = {"name": names.tolist(), "y": values}
+        if depth < self.depth - 1:
+            record["offsets"] = self._child_offsets(depth).astype(np.int64)
+        return record
+
+    @staticmethod
+    def _point_dicts(names, values, ids):
+        return [
+            {"name": name, "y": float(value), "drilldown": node_id}
+            for name, value, node_id in zip(names, values, ids)
+        ]
+
+    def top_level(self):
+        return self._point_dicts(*self.points(0))
+
+    def _series(self, depth, position, node_id):
+        start, stop = self._child_offsets(depth)[position:position + 2]
+        names, values, ids = self.points(depth + 1)
+        return {"id": node_id, "data": self._point_dicts(names[start:stop], values[start:stop], ids[start:stop])}
+
+    def children(self, node_id):
+        """
+        Drill-down series for one node, or None if the ID is unknown or a leaf.
+        """
+        for depth in range(self.depth - 1):
+            position = self._node_positions(depth).get(node_id)
+            if position is not None:
+                return self._series(depth, position, node_id)
+        return None
+
+    def drilldown_series(self, expanded=None):
+        """
+        All drill-down series, or only those for the node IDs in ``expanded``.
+        """
+        if expanded is not None:
+            return [series for series in map(self.children, expanded) if series is not None]
+        result = []
+        for depth in range(self.depth - 1):
+            ids = self.points(depth)[2]
+            result.extend(self._series(depth, position, node_id) for position, node_id in enumerate(ids))
+        return result
+
+
+def transform_data_for_drilldown(df, drill_columns, aggregation_column, expanded=None, tree=None):
+    """
+    Build the Highcharts drill-down payload (``top_level`` and ``drilldown``).
+
+    With ``expanded`` (an iterable of node IDs) only the series for those nodes
+    are emitted; by default the whole hierarchy is. A prebuilt ``tree`` (for
+    example from a rollup cube) is used instead of grouping ``df``.
+    """
+    if tree is None:
+        tree = DrilldownTree(df, drill_columns, aggregation_column)
+    return {
+        "top_level": tree.top_level(),
+        "drilldown": tree.drilldown_series(expanded),
+    }
+
+
+def compact_payload(tree):
+    """
+    Columnar drill-down payload: ``{"columns", "levels"}`` with integer node positions.
+
+    The children of node ``i`` of level ``d`` are the nodes
+    ``levels[d]["offsets"][i]:levels[d]["offsets"][i + 1]`` of level ``d + 1``.
+    """
+    return {
+        "columns": list(tree.drill_columns),
+        "levels": [tree.level_arrays(depth) for depth in range(tree.depth)],
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        # NaN is not valid JSON; send it as null like orjson does
+        return [None if isinstance(item, float) and item != item else item for item in value.tolist()]
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def dumps_payload(payload):
+    """
+    Serialize a drill-down payload to compact JSON text that is safe to inline in a <script>.
+    """
+    if orjson is not None:
+        text = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    else:
+        text = json.dumps(_jsonable(payload), separators=(",", ":"))
+    return text.replace("</", "<\\/")
@@ -0,0 +1,119 @@
+"""
+Cache of rendered figures keyed by dataset fingerprint and chart spec.
+
+Figures are stored as their serialized JSON so cached entries are immutable
+and cheap to share between callbacks. The in-memory tier is an LRU bounded by
+entry count and bytes; an optional directory (``FIGURE_CACHE_DIR``) persists
+figures across restarts and sessions and is swept down to
+``FIGURE_CACHE_MAX_BYTES``, least recently used first.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from disk_sweep import sweep, touch
+
+DEFAULT_MAX_ITEMS = 128
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MiB
+FIGURE_CACHE_DIR = os.environ.get("FIGURE_CACHE_DIR")
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("FIGURE_CACHE_MAX_BYTES", 1024 ** 3))
+
+
+def figure_key(fingerprint, spec):
+    """
+    Stable cache key for a dataset fingerprint and normalized chart spec.
+    """
+    payload = json.dumps({"dataset": fingerprint, "spec": spec}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FigureCache:
+    """
+    LRU cache of figure JSON with optional on-disk persistence and hit/miss counters.
+    """
+
+    def __init__(self, max_items=DEFAULT_MAX_ITEMS, max_bytes=DEFAULT_MAX_BYTES, directory=FIGURE_CACHE_DIR):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> figure JSON
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        Return the cached figure as a dict, or None on a miss.
+        """
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        if text is None and self.directory:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+                touch(self._path(key))
+            except OSError:
+                text = None
+            if text is not None:
+                self._remember(key, text)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(text)
+
+    def put(self, key, fig):
+        """
+        Cache a Plotly figure and return it as a dict.
+        """
+        return self.put_json(key, fig.to_json())
+
+    def put_json(self, key, text):
+        """
+        Cache an already serialized figure and return it as a dict.
+        """
+        self._remember(key, text)
+        if self.directory:
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(key))
+            sweep(self.directory, FIGURE_CACHE_MAX_BYTES, suffixes=(".json", ".tmp"))
+        return json.loads(text)
+
+    def _remember(self, key, text):
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self._total_bytes += len(text)
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_items or self._total_bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+
+# Process-wide figure cache shared by all callbacks
+figure_cache = FigureCache()
@@ -0,0 +1,175 @@
+"""
+Filter engine for app2.py's per-column filters.
+
+A predicate is a ``(column, kind, value)`` tuple: ``("range", (min, max))``
+for numeric sliders and ``("values", selected)`` for multiselects. All active
+predicates are evaluated into one NumPy boolean mask and the frame is indexed
+once, instead of materializing a new frame per column. Predicates that select
+everything (full slider range, every value ticked) are skipped entirely.
+
+``MaskCache`` keeps one mask per column across reruns and updates it by delta
+when its widget changes: range masks come from a cached sort order, so moving
+a slider bound only flips the rows between the old and new bound, and
+multiselect masks flip only the rows of values that were added or removed.
+"""
+import threading
+
+import numpy as np
+
+from column_index import ColumnIndex, option_value
+
+
+def is_noop(kind, value, option):
+    """
+    True if a predicate keeps every row, given the widget's ``option`` bounds/choices.
+    """
+    if option is None:
+        return False
+    if kind == "range":
+        _, lower, upper = option
+        min_val, max_val = value
+        return min_val <= lower and max_val >= upper
+    _, choices = option
+    return set(choices).issubset(value)
+
+
+def predicate_mask(series, kind, value):
+    """
+    Boolean mask of the rows of ``series`` that satisfy one predicate.
+    """
+    if kind == "range":
+        min_val, max_val = value
+        selected = series.ge(min_val) & series.le(max_val)
+    else:
+        selected = series.isin(list(value))
+    return selected.to_numpy(dtype=bool, na_value=False)
+
+
+def active_predicates(predicates, options=None):
+    """
+    Drop predicates that are no-ops for the current widget bounds.
+    """
+    options = options or {}
+    return tuple(
+        (col, kind, value) for col, kind, value in predicates
+        if not is_noop(kind, value, options.get(col))
+    )
+
+
+def combined_mask(df, predicates):
+    """
+    AND of all predicate masks, or None when there is nothing to filter.
+    """
+    mask = None
+    for col, kind, value in predicates:
+        selected = predicate_mask(df[col], kind, value)
+        if mask is None:
+            # to_numpy may return a read-only view (copy-on-write); the AND below writes in place
+            mask = selected.copy()
+        else:
+            np.logical_and(mask, selected, out=mask)
+    return mask
+
+
+def apply_filters(df, predicates, options=None):
+    """
+    Filter ``df`` by all active predicates in a single indexing pass.
+
+    Returns ``df`` itself (no copy) when every predicate is a no-op. Skipped
+    no-op predicates also keep rows that are missing in that column.
+    """
+    mask = combined_mask(df, active_predicates(predicates, options))
+    if mask is None:
+        return df
+    return df[mask]
+
+
+class MaskCache:
+    """
+    Per-column predicate masks for one frame, updated incrementally.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._sorted = {}  # col -> (order, sorted values) over non-null rows
+        self._indexes = {}  # col -> ColumnIndex
+        self._masks = {}  # col -> (kind, value, mask, state)
+        self._lock = threading.Lock()
+
+    def _sorted_column(self, col):
+        if col not in self._sorted:
+            values = self.df[col].to_numpy(dtype="float64", na_value=np.nan)
+            order = np.argsort(values, kind="stable")
+            valid = int(np.count_nonzero(~np.isnan(values)))
+            # NaN sorts last, so the first ``valid`` positions are the non-null rows
+            order = order[:valid]
+            self._sorted[col] = (order, values[order])
+        return self._sorted[col]
+
+    def _column_index(self, col):
+        if col not in self._indexes:
+            self._indexes[col] = ColumnIndex(self.df[col])
+        return self._indexes[col]
+
+    def _range_mask(self, col, value, previous):
+        order, sorted_values = self._sorted_column(col)
+        min_val, max_val = value
+        lo = int(np.searchsorted(sorted_values, min_val, side="left"))
+        hi = int(np.searchsorted(sorted_values, max(max_val, min_val), side="right"))
+        overlaps = previous is not None and previous[0] == "range" and lo < previous[3][1] and hi > previous[3][0]
+        if overlaps:
+            mask = previous[2]
+            old_lo, old_hi = previous[3]
+            # Flip only the rows between the old and new bounds
+            if lo < old_lo:
+                mask[order[lo:old_lo]] = True
+            else:
+                mask[order[old_lo:lo]] = False
+            if hi > old_hi:
+                mask[order[old_hi:hi]] = True
+            else:
+                mask[order[hi:old_hi]] = False
+        else:
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[order[lo:hi]] = True
+        return mask, (lo, hi)
+
+    def _values_mask(self, col, value, previous):
+        index = self._column_index(col)
+        selected = {option_value(v) for v in value}
+        if previous is not None and previous[0] == "values":
+            mask = previous[2]
+            old_selected = previous[3]
+            mask[index.rows_for(old_selected - selected)] = False
+            mask[index.rows_for(selected - old_selected)] = True
+        else:
+            mask = np.zeros(len(self.df), dtype=bool)
+            mask[index.rows_for(selected)] = True
+        return mask, selected
+
+    def column_mask(self, col, kind, value):
+        """
+        Mask for one predicate, derived from the column's previous mask when possible.
+        """
+        previous = self._masks.get(col)
+        if previous is not None and previous[:2] == (kind, value):
+            return previous[2]
+        if kind == "range":
+            mask, state = self._range_mask(col, value, previous)
+        else:
+            mask, state = self._values_mask(col, value, previous)
+        self._masks[col] = (kind, value, mask, state)
+        return mask
+
+    def apply(self, predicates):
+        """
+        Filter the frame by ``predicates`` (already stripped of no-ops).
+        """
+        if not predicates:
+            return self.df
+        with self._lock:
+            masks = [self.column_mask(col, kind, value) for col, kind, value in predicates]
+            combined = masks[0].copy()
+            for mask in masks[1:]:
+                np.logical_and(combined, mask, out=combined)
+        return self.df[combined]
@@ -0,0 +1,248 @@
+"""
+Batch geocoding for the map chart.
+
+Only the distinct place names of a column are resolved, and the coordinates
+are joined back onto the frame with a vectorized take. Resolved names are kept
+in a persistent SQLite store with a TTL, so repeated maps and restarts do not
+hit the network again. Lookups go through a chain of pluggable backends: an
+offline gazetteer file can answer without any network access, and Nominatim
+is queried for the remainder by a small, rate-limited worker pool.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration (overridable through the environment)
+CACHE_PATH = os.environ.get(
+    "GEOCODER_CACHE_PATH", os.path.join(PROJECT_ROOT, "data", "processed", "geocode_cache.sqlite")
+)
+GAZETTEER_PATH = os.environ.get("GEOCODER_GAZETTEER")
+OFFLINE = os.environ.get("GEOCODER_OFFLINE", "0") == "1"
+CACHE_TTL_SECONDS = float(os.environ.get("GEOCODER_TTL_SECONDS", 30 * 24 * 3600))
+# Failed lookups are retried sooner than successful ones expire
+MISS_TTL_SECONDS = float(os.environ.get("GEOCODER_MISS_TTL_SECONDS", 24 * 3600))
+MAX_WORKERS = int(os.environ.get("GEOCODER_MAX_WORKERS", 2))
+# Nominatim's usage policy allows at most one request per second
+MIN_REQUEST_INTERVAL = float(os.environ.get("GEOCODER_MIN_INTERVAL", 1.0))
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# Returned by a lookup whose backend raised (timeout, rate limit, network error),
+# as opposed to None for a name the backend answered as not found
+LOOKUP_FAILED = object()
+
+
+def normalize_place(name):
+    return " ".join(str(name).split()).casefold()
+
+
+class GeocodeStore:
+    """
+    Persistent place -> (lat, lon) store backed by SQLite, with expiry.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, miss_ttl=MISS_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "place TEXT PRIMARY KEY, lat REAL, lon REAL, fetched_at REAL NOT NULL)"
+            )
+
+    def get_many(self, places):
+        """
+        Return ``{place: (lat, lon)}`` for unexpired entries; misses map to (None, None).
+        """
+        now = time.time()
+        found = {}
+        places = list(places)
+        with self._lock:
+            for start in range(0, len(places), _SQL_BATCH):
+                batch = places[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT place, lat, lon, fetched_at FROM geocode WHERE place IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for place, lat, lon, fetched_at in rows:
+                    ttl = self.ttl if lat is not None else self.miss_ttl
+                    if now - fetched_at <= ttl:
+                        found[place] = (lat, lon)
+        return found
+
+    def put_many(self, coordinates):
+        now = time.time()
+        rows = [(place, lat, lon, now) for place, (lat, lon) in coordinates.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", rows)
+
+
+class GazetteerBackend:
+    """
+    Offline lookups from a CSV file with ``name``, ``lat`` and ``lon`` columns.
+    """
+    rate_limited = False
+
+    def __init__(self, path):
+        table = pd.read_csv(path, usecols=["name", "lat", "lon"])
+        table["name"] = table["name"].map(normalize_place)
+        table = table.drop_duplicates("name")
+        self._coordinates = dict(zip(table["name"], zip(table["lat"], table["lon"])))
+
+    def geocode(self, place):
+        return self._coordinates.get(place)
+
+
+class NominatimBackend:
+    """
+    Online lookups through OpenStreetMap Nominatim (requires geopy).
+    """
+    rate_limited = True
+
+    def __init__(self, user_agent="dynamic_analytics"):
+        from geopy.geocoders import Nominatim
+
+        self._geolocator = Nominatim(user_agent=user_agent)
+
+    def geocode(self, place):
+        location = self._geolocator.geocode(place)
+        if location:
+            return location.latitude, location.longitude
+        return None
+
+
+class _RateLimiter:
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Geocoder:
+    """
+    Resolve place names through the store first, then each backend in turn.
+    """
+
+    def __init__(self, backends, store=None, max_workers=MAX_WORKERS, min_interval=MIN_REQUEST_INTERVAL):
+        self.backends = list(backends)
+        self.store = store
+        self.max_workers = max_workers
+        self._limiter = _RateLimiter(min_interval)
+
+    def _lookup(self, backend, place):
+        if backend.rate_limited:
+            self._limiter.wait()
+        try:
+            return backend.geocode(place)
+        except Exception as e:
+            print(f"Error fetching coordinates for {place}: {e}")
+            return LOOKUP_FAILED
+
+    def geocode_many(self, places, progress=None):
+        """
+        Resolve an iterable of normalized place names to ``{place: (lat, lon)}``.
+
+        ``progress``, if given, is called as ``progress(done, total)``.
+        """
+        places = list(dict.fromkeys(places))
+        resolved = self.store.get_many(places) if self.store else {}
+        pending = [place for place in places if place not in resolved]
+        total = len(places)
+        if progress:
+            progress(len(resolved), total)
+
+        fetched = {}
+        failed = set()
+        for backend in self.backends:
+            if not pending:
+                break
+            if backend.rate_limited:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    results = pool.map(lambda place: self._lookup(backend, place), pending)
+                    for place, result in zip(pending, results):
+                        if result is LOOKUP_FAILED:
+                            failed.add(place)
+                        elif result:
+                            fetched[place] = result
+                        if progress:
+                            progress(len(resolved) + len(fetched), total)
+            else:
+                for place in pending:
+                    result = self._lookup(backend, place)
+                    if result is LOOKUP_FAILED:
+                        failed.add(place)
+                    elif result:
+                        fetched[place] = result
+            pending = [place for place in pending if place not in fetched]
+
+        # Remember names no backend knows, so they are not re-queried on every chart;
+        # names whose lookup errored are left out of the store and retried next time
+        fetched.update({place: (None, None) for place in pending if place not in failed})
+        if self.store and fetched:
+            self.store.put_many(fetched)
+        resolved.update(fetched)
+        resolved.update({place: (None, None) for place in pending if place in failed})
+        if progress:
+            progress(total, total)
+        return resolved
+
+    def add_coordinates(self, df, column, progress=None):
+        """
+        Return a copy of ``df`` with ``lat``/``lon`` columns for the places in ``column``.
+        """
+        codes, uniques = pd.factorize(df[column])
+        keys = [normalize_place(value) for value in uniques]
+        resolved = self.geocode_many(keys, progress=progress)
+
+        lat = np.array([resolved.get(key, (None, None))[0] for key in keys], dtype="float64")
+        lon = np.array([resolved.get(key, (None, None))[1] for key in keys], dtype="float64")
+        # factorize marks nulls with -1; point those at an appended NaN slot
+        lat = np.append(lat, np.nan)
+        lon = np.append(lon, np.nan)
+        return df.assign(lat=lat[codes], lon=lon[codes])
+
+
+def build_default_geocoder():
+    """
+    Build the geocoder configured by the ``GEOCODER_*`` environment variables.
+    """
+    backends = []
+    if GAZETTEER_PATH:
+        backends.append(GazetteerBackend(GAZETTEER_PATH))
+    if not OFFLINE:
+        backends.append(NominatimBackend())
+    return Geocoder(backends, store=GeocodeStore())
+
+
+_default_geocoder = None
+_default_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _default_geocoder
+    with _default_lock:
+        if _default_geocoder is None:
+            _default_geocoder = build_default_geocoder()
+        return _default_geocoder
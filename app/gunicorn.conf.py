@@ -0,0 +1,25 @@
+"""
+gunicorn settings for serving app.py in production (see wsgi.py).
+"""
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+pythonpath = chdir
+bind = os.environ.get("DASH_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Threads per worker, so slow callbacks do not block the fast ones
+worker_class = "gthread"
+threads = int(os.environ.get("DASH_THREADS", "4"))
+# Import the app once in the master; workers fork with it already loaded
+preload_app = True
+timeout = 120
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the forked workers
+    from background import background_manager
+
+    if background_manager is not None:
+        background_manager.handle.close()
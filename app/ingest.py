@@ -0,0 +1,308 @@
+"""
+Upload ingestion: decode, parse and compact uploaded data files.
+
+The base64 payload from ``dcc.Upload`` is decoded straight into a bytes
+buffer and its format is detected from the leading magic bytes:
+
+* Parquet, Feather (v1 and v2) and Arrow IPC files/streams are read with
+  pyarrow directly from the buffer, without copying it, and only the
+  requested columns are decoded. Their dtypes are kept as stored.
+* CSV, plain or gzip/zstd compressed, is parsed with the pyarrow engine when
+  it is installed, falling back to a chunked parse with the C engine. Column
+  dtypes are then compacted (lossless numeric downcasts, low-cardinality
+  strings to categoricals, date parsing) while missing values are kept as
+  real nulls.
+"""
+import base64
+import importlib.util
+import io
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# Checked without importing pyarrow, which is only loaded when a file is parsed
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Rows per chunk for the C-engine fallback
+CHUNK_SIZE = 100_000
+# String columns whose distinct/total ratio is below this become categoricals
+CATEGORY_RATIO = 0.5
+# Number of non-null values sampled when deciding whether a column holds dates
+DATE_SAMPLE_SIZE = 200
+# Peak-memory tracing slows parsing down considerably, so it is opt-in
+TRACE_MEMORY = os.environ.get("INGEST_TRACE_MEMORY", "0") == "1"
+# tracemalloc is process-wide; only one upload at a time may start and stop it
+_trace_lock = threading.Lock()
+
+# Leading magic bytes -> format; anything else is treated as plain CSV
+FORMAT_MAGIC = (
+    (b"PAR1", "parquet"),
+    (b"ARROW1", "arrow"),
+    (b"FEA1", "feather"),
+    (b"\xff\xff\xff\xff", "arrow-stream"),
+    (b"\x1f\x8b", "csv.gz"),
+    (b"\x28\xb5\x2f\xfd", "csv.zst"),
+)
+COLUMNAR_FORMATS = ("parquet", "arrow", "feather", "arrow-stream")
+CSV_COMPRESSION = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+# File extensions accepted by the upload widgets
+UPLOAD_EXTENSIONS = ("csv", "gz", "zst", "parquet", "feather", "arrow", "ipc")
+
+
+@dataclass
+class IngestReport:
+    """
+    Timing and memory figures for a single upload.
+
+    ``peak_bytes`` is the tracemalloc peak, which covers Python and NumPy
+    allocations but not memory owned by the Arrow memory pool. It is None
+    unless memory tracing was requested (``INGEST_TRACE_MEMORY=1``).
+    """
+    engine: str
+    format: str = "csv"
+    rows: int = 0
+    columns: int = 0
+    raw_bytes: int = 0
+    frame_bytes: int = 0
+    parse_seconds: float = 0.0
+    total_seconds: float = 0.0
+    peak_bytes: int = None
+    converted: dict = field(default_factory=dict)
+
+    def summary(self):
+        peak = f"Peak memory: {self.peak_bytes / 1e6:.1f} MB | " if self.peak_bytes is not None else ""
+        return (
+            f"Parsed {self.rows:,} rows in {self.parse_seconds:.2f}s ({self.format}, {self.engine}) | {peak}"
+            f"In-memory size: {self.frame_bytes / 1e6:.1f} MB (upload {self.raw_bytes / 1e6:.1f} MB)"
+        )
+
+
+def decode_contents(contents):
+    """
+    Decode a ``dcc.Upload`` data URL into raw bytes without an intermediate str.
+    """
+    _, content_string = contents.split(",", 1)
+    return base64.b64decode(content_string)
+
+
+def _no_progress(fraction, message):
+    pass
+
+
+def detect_format(raw):
+    """
+    Name the format of an upload from its magic bytes (see ``FORMAT_MAGIC``).
+    """
+    head = bytes(raw[:8])
+    for magic, name in FORMAT_MAGIC:
+        if head.startswith(magic):
+            return name
+    return "csv"
+
+
+def _arrow_buffer(raw):
+    import pyarrow as pa
+
+    # py_buffer wraps the bytes without copying them
+    return pa.BufferReader(pa.py_buffer(raw))
+
+
+def read_columnar_bytes(raw, fmt, columns=None):
+    """
+    Read a Parquet/Feather/Arrow upload into a DataFrame, decoding only ``columns``.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(_arrow_buffer(raw), columns=columns)
+    elif fmt == "arrow-stream":
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(_arrow_buffer(raw)).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    else:
+        from pyarrow import feather
+
+        table = feather.read_table(_arrow_buffer(raw), columns=columns, memory_map=False)
+    # split_blocks avoids consolidating columns into 2D blocks, which would copy them
+    return table.to_pandas(split_blocks=True)
+
+
+def read_column_names(raw, fmt=None):
+    """
+    Column names of an upload, read from its schema or CSV header only.
+    """
+    fmt = fmt or detect_format(raw)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(_arrow_buffer(raw)).names)
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        return list(pa.ipc.open_file(_arrow_buffer(raw)).schema.names)
+    if fmt == "arrow-stream":
+        import pyarrow as pa
+
+        return list(pa.ipc.open_stream(_arrow_buffer(raw)).schema.names)
+    if fmt == "feather":
+        return list(read_columnar_bytes(raw, fmt).columns)
+    return list(pd.read_csv(io.BytesIO(raw), nrows=0, compression=CSV_COMPRESSION[fmt]).columns)
+
+
+def read_csv_bytes(raw, progress=_no_progress, compression=None, columns=None):
+    """
+    Parse CSV bytes into a DataFrame, returning the frame and the engine used.
+
+    ``compression`` is ``None``, ``"gzip"`` or ``"zstd"``; only ``columns``
+    are kept when given. ``progress(fraction, message)`` is called with the
+    share of bytes parsed on the chunked path; the pyarrow engine parses in
+    one call.
+    """
+    if HAS_PYARROW:
+        try:
+            data = pd.read_csv(io.BytesIO(raw), engine="pyarrow", compression=compression, usecols=columns)
+            return data, "pyarrow"
+        except Exception:
+            # Fall back to the C engine for inputs pyarrow rejects (ragged rows, odd quoting)
+            pass
+
+    chunks = []
+    buffer = io.BytesIO(raw)
+    reader = pd.read_csv(
+        buffer, chunksize=CHUNK_SIZE, low_memory=False, compression=compression, usecols=columns
+    )
+    for chunk in reader:
+        chunks.append(downcast_numeric(chunk))
+        progress(buffer.tell() / max(1, len(raw)), f"Parsed {sum(map(len, chunks)):,} rows")
+    if not chunks:
+        return pd.DataFrame(), "c"
+    return pd.concat(chunks, ignore_index=True), "c-chunked"
+
+
+def downcast_numeric(df):
+    """
+    Shrink integer and float columns to the smallest dtype that holds their values exactly.
+    """
+    for col in df.select_dtypes(include=["integer"]).columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    for col in df.select_dtypes(include=["float64"]).columns:
+        values = df[col].to_numpy()
+        narrowed = values.astype(np.float32)
+        # float32 only when every value survives the round trip (19.99 does not)
+        if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+            df[col] = narrowed
+    return df
+
+
+def _looks_like_dates(series):
+    sample = series.dropna()
+    if sample.empty:
+        return False
+    sample = sample.iloc[:DATE_SAMPLE_SIZE].astype(str)
+    # Bare numbers parse as epoch offsets; only treat text containing separators as dates
+    if not sample.str.contains(r"[-/:]", regex=True).all():
+        return False
+    try:
+        pd.to_datetime(sample, errors="raise", format="mixed")
+    except (ValueError, TypeError, OverflowError):
+        return False
+    return True
+
+
+def optimize_dtypes(df):
+    """
+    Compact column dtypes in place and return a mapping of column -> new dtype.
+    """
+    converted = {}
+    downcast_numeric(df)
+    for col in df.columns:
+        series = df[col]
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        if _looks_like_dates(series):
+            dates = pd.to_datetime(series, errors="coerce", format="mixed")
+            # Only the head of the column was checked; a later non-date value keeps it as text
+            if dates.isna().sum() == series.isna().sum():
+                df[col] = dates
+                converted[col] = str(df[col].dtype)
+                continue
+        if len(series) and series.nunique(dropna=True) / len(series) < CATEGORY_RATIO:
+            df[col] = series.astype("category")
+            converted[col] = str(df[col].dtype)
+    return converted
+
+
+def load_bytes(raw, columns=None, progress=_no_progress):
+    """
+    Read an upload of any supported format; returns ``(df, format, engine)``.
+
+    CSV frames are returned as parsed; ``optimize_dtypes`` is left to the caller.
+    """
+    fmt = detect_format(raw)
+    if fmt in COLUMNAR_FORMATS:
+        if not HAS_PYARROW:
+            raise ValueError(f"Reading {fmt} files requires pyarrow")
+        return read_columnar_bytes(raw, fmt, columns), fmt, "pyarrow"
+    data, engine = read_csv_bytes(raw, progress, compression=CSV_COMPRESSION[fmt], columns=columns)
+    return data, fmt, engine
+
+
+def preprocess_upload(contents, progress=None, columns=None, trace_memory=TRACE_MEMORY):
+    """
+    Decode, parse and compact an uploaded CSV, Parquet, Feather or Arrow file.
+
+    Returns the DataFrame and an ``IngestReport`` with parse time and, with
+    ``trace_memory``, peak memory. Missing values are left as nulls so numeric
+    columns keep their dtype.
+    ``columns``, if given, limits which columns are read.
+    ``progress(fraction, message)``, if given, is called as parsing advances.
+    """
+    progress = progress or _no_progress
+    started = time.perf_counter()
+    peak = None
+    # Uploads running while another one holds the tracer are simply not measured
+    tracing = trace_memory and not tracemalloc.is_tracing() and _trace_lock.acquire(blocking=False)
+    if tracing:
+        tracemalloc.start()
+    try:
+        progress(0.0, "Decoding upload")
+        raw = decode_contents(contents)
+        parse_started = time.perf_counter()
+        # Parsing covers 5-85% of the progress range
+        data, fmt, engine = load_bytes(
+            raw, columns, lambda fraction, message: progress(0.05 + 0.8 * fraction, message)
+        )
+        parse_seconds = time.perf_counter() - parse_started
+        if fmt in COLUMNAR_FORMATS:
+            # Stored dtypes are already typed; re-inferring them would only copy
+            converted = {}
+        else:
+            progress(0.85, "Optimizing column types")
+            converted = optimize_dtypes(data)
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if tracing:
+            tracemalloc.stop()
+            _trace_lock.release()
+
+    report = IngestReport(
+        engine=engine,
+        format=fmt,
+        rows=len(data),
+        columns=len(data.columns),
+        raw_bytes=len(raw),
+        frame_bytes=int(data.memory_usage(index=True, deep=True).sum()),
+        parse_seconds=parse_seconds,
+        total_seconds=time.perf_counter() - started,
+        peak_bytes=peak,
+        converted=converted,
+    )
+    return data, report
@@ -0,0 +1,266 @@
+"""
+Performance instrumentation for Dash callbacks and Streamlit pipeline stages.
+
+Every measured call produces one record with wall time, CPU time and any
+fields the call adds through ``annotate`` (row counts, cache hits, ...). For
+Dash callbacks the request and response sizes are filled in by Flask hooks.
+Records are appended as JSON lines to ``logs/perf.jsonl``, which is rotated
+once it reaches ``PERF_LOG_MAX_BYTES``. Callbacks running
+as background jobs measure themselves in the job process, so the in-app
+Performance panel reads the tail of that shared log rather than the records
+kept in this process's memory; the response that delivers a job's result is
+logged by the web process with its payload sizes.
+
+Sampling profilers are opt-in: set ``PERF_PROFILE_MODE`` to ``cprofile`` or
+``pyinstrument`` and ``PERF_PROFILE_SAMPLE_RATE`` to the share of calls to
+profile; profiles are written under ``logs/profiles/``.
+"""
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.environ.get("PERF_LOG_DIR", os.path.join(PROJECT_ROOT, "logs"))
+PROFILE_MODE = os.environ.get("PERF_PROFILE_MODE", "").lower()
+PROFILE_SAMPLE_RATE = float(os.environ.get("PERF_PROFILE_SAMPLE_RATE", "0.05"))
+# Size at which perf.jsonl is rotated, and how many rotated files are kept
+LOG_MAX_BYTES = int(os.environ.get("PERF_LOG_MAX_BYTES", 20 * 1024 ** 2))
+LOG_BACKUP_COUNT = int(os.environ.get("PERF_LOG_BACKUP_COUNT", 3))
+RECENT_LIMIT = 200
+# Bytes read from the end of the shared log for the Performance panel
+RECENT_TAIL_BYTES = 512 * 1024
+
+# Most recent records of this process, newest last (see ``read_recent_records`` for all processes)
+recent_records = deque(maxlen=RECENT_LIMIT)
+
+_current_record = contextvars.ContextVar("perf_record", default=None)
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _log_path():
+    return os.path.join(LOG_DIR, "perf.jsonl")
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            logger = logging.getLogger("dynamic_analytics.perf")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if not logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    _log_path(), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+def write_record(record):
+    """
+    Keep a finished record for the Performance panel and append it to the JSON log.
+    """
+    recent_records.append(record)
+    _get_logger().info(json.dumps(record, default=str))
+
+
+def annotate(**fields):
+    """
+    Add fields (rows, cache_hit, ...) to the record of the call being measured.
+    """
+    record = _current_record.get()
+    if record is not None:
+        record.update(fields)
+
+
+def _start_profiler():
+    if PROFILE_MODE not in ("cprofile", "pyinstrument") or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if PROFILE_MODE == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            return None
+        profiler = Profiler()
+        profiler.start()
+    else:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, record):
+    if profiler is None:
+        return
+    directory = os.path.join(LOG_DIR, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    stem = f"{record['name']}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    if PROFILE_MODE == "cprofile":
+        profiler.disable()
+        path = os.path.join(directory, f"{stem}.prof")
+        profiler.dump_stats(path)
+    else:
+        profiler.stop()
+        path = os.path.join(directory, f"{stem}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    record["profile"] = path
+
+
+def _finish(record):
+    # Inside a Flask request the after_request hook adds payload sizes and writes it
+    try:
+        from flask import g, has_request_context
+
+        if has_request_context():
+            g.setdefault("perf_records", []).append(record)
+            return
+    except ImportError:
+        pass
+    write_record(record)
+
+
+@contextmanager
+def measure(kind, name, **fields):
+    """
+    Measure the enclosed block as one record of the given kind and name.
+    """
+    record = {"ts": datetime.now(timezone.utc).isoformat(), "kind": kind, "name": name, "pid": os.getpid()}
+    record.update(fields)
+    token = _current_record.set(record)
+    profiler = _start_profiler()
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        yield record
+    except Exception as e:
+        # PreventUpdate is control flow, not a failure
+        if type(e).__name__ == "PreventUpdate":
+            record["prevented"] = True
+        else:
+            record["error"] = repr(e)
+        raise
+    finally:
+        record["wall_ms"] = round((time.perf_counter() - wall_started) * 1000, 3)
+        record["cpu_ms"] = round((time.thread_time() - cpu_started) * 1000, 3)
+        _stop_profiler(profiler, record)
+        _current_record.reset(token)
+        _finish(record)
+
+
+def instrument(name=None, kind="callback"):
+    """
+    Decorator measuring every call of a function as a record.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(kind, name or func.__name__):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def install_request_hooks(server):
+    """
+    Record Dash callback request/response sizes on a Flask server.
+    """
+    from flask import g, request
+
+    @server.before_request
+    def _start_request_timer():
+        g.perf_started = time.perf_counter()
+
+    @server.after_request
+    def _record_payload_sizes(response):
+        records = g.pop("perf_records", None)
+        if not records and request.args.get("job") and _is_job_result(response):
+            # Background callback result: the callback itself was measured in the job process
+            body = request.get_json(silent=True) or {}
+            records = [{
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "kind": "background_result",
+                "name": f"{body.get('output', request.path)} (result)",
+                "pid": os.getpid(),
+                "wall_ms": round((time.perf_counter() - g.get("perf_started", time.perf_counter())) * 1000, 3),
+            }]
+        if records:
+            bytes_in = request.content_length or 0
+            bytes_out = response.calculate_content_length() if not response.is_streamed else None
+            for record in records:
+                record["bytes_in"] = bytes_in
+                record["bytes_out"] = bytes_out
+                write_record(record)
+        return response
+
+
+def _is_job_result(response):
+    # Polls of a running job return progress only; the final one carries the callback's "response"
+    if response.is_streamed or response.status_code != 200:
+        return False
+    return b'"response"' in response.get_data()
+
+
+def _read_tail(path, max_bytes):
+    """
+    Complete lines among the last ``max_bytes`` of ``path``.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        lines = f.read().splitlines()
+    if size > max_bytes:
+        lines = lines[1:]  # Starts mid-record
+    return lines, size
+
+
+def read_recent_records(limit=RECENT_LIMIT):
+    """
+    The most recent records of all processes writing the shared log, newest last.
+
+    Falls back to this process's in-memory records when the log cannot be read.
+    """
+    try:
+        lines, size = _read_tail(_log_path(), RECENT_TAIL_BYTES)
+    except OSError:
+        return list(recent_records)[-limit:]
+    if len(lines) < limit and size < RECENT_TAIL_BYTES:
+        # Just rotated: the rest of the tail is in the previous file
+        try:
+            previous, _ = _read_tail(f"{_log_path()}.1", RECENT_TAIL_BYTES - size)
+            lines = previous + lines
+        except OSError:
+            pass
+    records = []
+    for line in lines[-limit:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def slowest_records(limit=10, kinds=None):
+    """
+    The slowest recent records of all processes (only those of ``kinds``, if given), slowest first.
+    """
+    records = [record for record in read_recent_records() if kinds is None or record.get("kind") in kinds]
+    return sorted(records, key=lambda record: record.get("wall_ms") or 0, reverse=True)[:limit]
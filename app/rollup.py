@@ -0,0 +1,75 @@
+"""
+Materialized rollup cube for repeated group-bys and drill-downs in app2.py.
+
+The cube is one group-by of the (filtered) rows over a set of dimension
+columns, storing per group combination the row count and, for every measure,
+its sum, non-null count, min and max. Any group-by over a subset of the
+dimensions is then a roll-up of the cube, which has one row per combination
+rather than per record: sums and counts add up, min/max take the min/max,
+and the mean is derived as sum / count.
+
+A cube describes exactly the rows it was built from, so app2.py keys it on
+the filter state and a new filter builds a new cube.
+"""
+import pandas as pd
+
+from drilldown import DrilldownTree
+
+# Column of the cube holding the number of rows per combination
+ROWS = "__rows__"
+_ROLLUP = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+class RollupCube:
+    """
+    Sum/count/min/max of ``measures`` per combination of ``dimensions``.
+    """
+
+    def __init__(self, df, dimensions, measures):
+        self.dimensions = list(dimensions)
+        self.measures = [col for col in measures if col not in self.dimensions]
+        grouped = df.groupby(self.dimensions, observed=True, dropna=False)
+        rows = grouped.size().to_frame()
+        rows.columns = pd.MultiIndex.from_tuples([(ROWS, "")])
+        if self.measures:
+            self.table = pd.concat([grouped[self.measures].agg(["sum", "count", "min", "max"]), rows], axis=1)
+        else:
+            self.table = rows
+
+    def __len__(self):
+        return len(self.table)
+
+    def covers(self, columns, measures=()):
+        """
+        Whether group-bys over ``columns`` aggregating ``measures`` can be answered from the cube.
+        """
+        return set(columns) <= set(self.dimensions) and set(measures) <= set(self.measures)
+
+    def _rollup(self, columns, measures, dropna):
+        stats = [(measure, stat) for measure in measures for stat in _ROLLUP]
+        table = self.table[stats + [(ROWS, "")]]
+        return table.groupby(level=list(columns), observed=True, dropna=dropna).agg(
+            {column: _ROLLUP.get(column[1], "sum") for column in table.columns}
+        )
+
+    def group_by(self, group_by_column, method, value_columns):
+        """
+        Same result as ``PandasBackend.group_by`` on the rows the cube was built from.
+        """
+        # Matches DataFrame.groupby's default of dropping missing keys
+        rolled = self._rollup([group_by_column], value_columns if method != "Count" else [], dropna=True)
+        if method == "Count":
+            return rolled[(ROWS, "")].rename("Count").reset_index()
+        if method == "Mean":
+            result = pd.DataFrame({col: rolled[(col, "sum")] / rolled[(col, "count")] for col in value_columns})
+        else:
+            stat = {"Sum": "sum", "Max": "max", "Min": "min"}[method]
+            result = pd.DataFrame({col: rolled[(col, stat)] for col in value_columns})
+        return result.reset_index()
+
+    def drilldown_tree(self, drill_columns, aggregation_column):
+        """
+        ``DrilldownTree`` over ``drill_columns`` built from the cube's sums.
+        """
+        leaf = self._rollup(drill_columns, [aggregation_column], dropna=False)[(aggregation_column, "sum")]
+        return DrilldownTree.from_leaf(leaf.rename(aggregation_column), drill_columns, aggregation_column)
@@ -0,0 +1,159 @@
+"""
+Server-side paging, sorting and filtering for the data preview table.
+
+The preview ``DataTable`` runs with ``page_action``, ``sort_action`` and
+``filter_action`` set to ``"custom"``, so only the requested page is sent to
+the browser. Sort orders and filter results are computed once per dataset as
+integer row positions and cached, so paging through a sorted/filtered view
+only slices positions and never re-sorts or copies the frame.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Number of cached sort orders / filter results kept across all datasets
+MAX_CACHED_QUERIES = 32
+
+# Operators understood by the DataTable filter row, in match priority order
+FILTER_OPERATORS = [
+    ["ge ", ">="],
+    ["le ", "<="],
+    ["lt ", "<"],
+    ["gt ", ">"],
+    ["ne ", "!="],
+    ["eq ", "="],
+    ["contains "],
+    ["datestartswith "],
+]
+
+_query_cache = OrderedDict()
+_query_lock = threading.Lock()
+
+
+def _cached(key, compute):
+    with _query_lock:
+        if key in _query_cache:
+            _query_cache.move_to_end(key)
+            return _query_cache[key]
+    value = compute()
+    with _query_lock:
+        _query_cache[key] = value
+        while len(_query_cache) > MAX_CACHED_QUERIES:
+            _query_cache.popitem(last=False)
+    return value
+
+
+def split_filter_part(filter_part):
+    """
+    Split one ``{column} op value`` clause of a DataTable filter query.
+    """
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+                operator_name = operator_type[0].strip()
+                value_part = value_part.strip()
+                v0 = value_part[:1]
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', "`"):
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                elif operator_name in ("contains", "datestartswith"):
+                    # Text matches use the value as typed ("5" must not become "5.0")
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+                return name, operator_name, value
+    return None, None, None
+
+
+def _clause_mask(series, operator, value):
+    if operator == "contains":
+        return series.astype(str).str.contains(str(value), regex=False, na=False).to_numpy()
+    if operator == "datestartswith":
+        return series.astype(str).str.startswith(str(value), na=False).to_numpy()
+    numeric = pd.api.types.is_numeric_dtype(series)
+    if numeric and not isinstance(value, float):
+        return np.zeros(len(series), dtype=bool)
+    if not numeric and isinstance(value, float):
+        # Numeric literal typed against a text column: compare as the typed text
+        value = str(int(value)) if value.is_integer() else str(value)
+    comparisons = {
+        "eq": series.eq,
+        "ne": series.ne,
+        "lt": series.lt,
+        "le": series.le,
+        "gt": series.gt,
+        "ge": series.ge,
+    }
+    return comparisons[operator](value).fillna(False).to_numpy(dtype=bool)
+
+
+def filter_positions(dataset_key, df, filter_query):
+    """
+    Return the sorted row positions matching a DataTable filter query.
+    """
+    if not filter_query:
+        return None
+
+    def compute():
+        mask = np.ones(len(df), dtype=bool)
+        for part in filter_query.split(" && "):
+            name, operator, value = split_filter_part(part)
+            if name not in df.columns:
+                continue
+            try:
+                mask &= _clause_mask(df[name], operator, value)
+            except TypeError:
+                mask[:] = False
+        return np.flatnonzero(mask)
+
+    return _cached((dataset_key, "filter", filter_query), compute)
+
+
+def sort_positions(dataset_key, df, sort_by):
+    """
+    Return row positions in the order given by a DataTable ``sort_by`` list.
+    """
+    if not sort_by:
+        return None
+    spec = tuple((s["column_id"], s["direction"]) for s in sort_by if s["column_id"] in df.columns)
+    if not spec:
+        return None
+
+    def compute():
+        columns = [column for column, _ in spec]
+        ascending = [direction == "asc" for _, direction in spec]
+        ordered = df[columns].reset_index(drop=True).sort_values(
+            columns, ascending=ascending, kind="stable", na_position="last"
+        )
+        return ordered.index.to_numpy()
+
+    return _cached((dataset_key, "sort", spec), compute)
+
+
+def query_page(dataset_key, df, page_current, page_size, sort_by=None, filter_query=None):
+    """
+    Return ``(records, page_count)`` for one page of the filtered, sorted view.
+    """
+    positions = filter_positions(dataset_key, df, filter_query)
+    order = sort_positions(dataset_key, df, sort_by)
+    if order is not None and positions is not None:
+        keep = np.zeros(len(df), dtype=bool)
+        keep[positions] = True
+        positions = order[keep[order]]
+    elif order is not None:
+        positions = order
+
+    total = len(df) if positions is None else len(positions)
+    page_count = max(1, -(-total // page_size))
+    start = (page_current or 0) * page_size
+    if positions is None:
+        page = df.iloc[start:start + page_size]
+    else:
+        page = df.iloc[positions[start:start + page_size]]
+    return page.to_dict("records"), page_count
@@ -0,0 +1,97 @@
+"""
+Time-aware preparation for line charts over datetime x axes.
+
+The rows of a dataset are ordered by a datetime column once (``time_order``,
+cached with the dataset and persisted next to its spill file), so every line
+chart on that column starts from already sorted data; scoping filters only
+drop positions from the order and never re-sort. Long series are then
+resampled into minute, hour or day buckets with one vectorized group-by,
+which turns a multi-year sensor export into a few thousand points.
+"""
+import numpy as np
+import pandas as pd
+
+from dataset_cache import dataset_cache
+
+# Resample choices offered for line charts, finest first
+RESAMPLE_STEPS = {
+    "minute": pd.Timedelta(minutes=1),
+    "hour": pd.Timedelta(hours=1),
+    "day": pd.Timedelta(days=1),
+}
+RESAMPLE_LABELS = {"minute": "per-minute means", "hour": "hourly means", "day": "daily means"}
+# Most buckets "auto" resampling may produce
+MAX_BUCKETS = 5_000
+
+
+def is_time_axis(series):
+    return pd.api.types.is_datetime64_any_dtype(series)
+
+
+def time_order(series):
+    """
+    Row positions of ``series`` in ascending time order, missing timestamps dropped.
+    """
+    values = series.to_numpy(dtype="datetime64[ns]")
+    order = np.argsort(values.view(np.int64), kind="stable")
+    # NaT sorts first as the smallest int64
+    return order[~np.isnat(values[order])]
+
+
+def get_time_order(dataset_key, column):
+    """
+    Cached time order of a dataset's datetime column, or None if it is not one.
+    """
+    df = dataset_cache.get(dataset_key)
+    if df is None or column not in df.columns or not is_time_axis(df[column]):
+        return None
+    return dataset_cache.derived(
+        dataset_key, f"time_order:{column}", lambda frame: time_order(frame[column]), persist=True
+    )
+
+
+def restrict_order(order, positions, n_rows):
+    """
+    Keep the entries of ``order`` that are among ``positions``, preserving the order.
+    """
+    keep = np.zeros(n_rows, dtype=bool)
+    keep[positions] = True
+    return order[keep[order]]
+
+
+def choose_step(df, x, budget=MAX_BUCKETS):
+    """
+    Finest resample step giving at most ``budget`` buckets over the time span of ``df[x]``.
+    """
+    span = df[x].max() - df[x].min()
+    for name, step in RESAMPLE_STEPS.items():
+        if pd.isna(span) or span / step <= budget:
+            return name
+    return "day"
+
+
+def resample_step(df, x, y, resample, budget):
+    """
+    Resample step of a line chart's ``resample`` setting, or None to plot the rows themselves.
+
+    "auto" resamples only frames over ``budget`` rows, at the finest step
+    that fits ``MAX_BUCKETS``; fixed steps always apply.
+    """
+    if resample not in RESAMPLE_STEPS and resample != "auto":
+        return None
+    if not (x and y) or not is_time_axis(df[x]) or not pd.api.types.is_numeric_dtype(df[y]):
+        return None
+    if resample == "auto":
+        return choose_step(df, x) if len(df) > budget else None
+    return resample
+
+
+def resample_frame(df, x, y, color=None, step="hour"):
+    """
+    Mean of ``y`` per ``step`` bucket of ``x`` (and per ``color``), empty buckets dropped.
+    """
+    keys = [pd.Grouper(key=x, freq=RESAMPLE_STEPS[step])]
+    if color:
+        keys.append(color)
+    resampled = df.groupby(keys, observed=True)[y].mean()
+    return resampled.dropna().reset_index()
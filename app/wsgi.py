@@ -0,0 +1,40 @@
+"""
+Production entry point for the Dash app in app.py.
+
+Run from the project root with
+
+    gunicorn --config app/gunicorn.conf.py wsgi:server
+
+gunicorn.conf.py forks several worker processes from one preloaded copy of
+the app. The workers share datasets and figures through the disk tiers of the
+dataset and figure caches under ``DASH_SHARED_CACHE_DIR``, so a request can
+be served by any worker regardless of which one parsed the upload. Responses
+are compressed when flask-compress is installed.
+"""
+import os
+import tempfile
+
+from dataset_cache import dataset_cache
+from figure_cache import figure_cache
+
+SHARED_CACHE_DIR = os.environ.get(
+    "DASH_SHARED_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dynamic_analytics", "shared")
+)
+
+# Configured before app.py is imported, so every dataset it registers is shared
+if not dataset_cache.spill_dir:
+    dataset_cache.spill_dir = os.path.join(SHARED_CACHE_DIR, "datasets")
+if not figure_cache.directory:
+    figure_cache.directory = os.path.join(SHARED_CACHE_DIR, "figures")
+    os.makedirs(figure_cache.directory, exist_ok=True)
+
+from app import app  # noqa: E402
+
+server = app.server
+
+try:
+    from flask_compress import Compress
+
+    Compress(server)
+except ImportError:
+    print("flask-compress is not installed; responses are sent uncompressed")
@@ -0,0 +1,156 @@
+"""
+Cold-start benchmark for the Dash and Streamlit apps.
+
+Every run starts a fresh interpreter, as a newly scaled-up worker would, and
+measures:
+
+- ``import``: importing app.py (module imports, app and callback setup)
+- ``first_layout``: the first page load, which builds and serializes the layout
+- ``first_callback``: the first interactive callback request
+- ``first_figure``: building the first chart, which loads Plotly
+- ``app2_first_run``: one full script run of app2.py (Streamlit installed only)
+
+plus the slowest modules from ``python -X importtime``.
+
+Usage:
+    python benchmarks/cold_start.py --repeat 5
+    python benchmarks/cold_start.py --compare benchmarks/results/cold-<previous>.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from run_benchmarks import PROJECT_ROOT, RESULTS_DIR, git_revision
+
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+
+# Runs in the fresh interpreter; prints one JSON object of timings in seconds
+DASH_PROBE = """
+import json, time
+started = time.perf_counter()
+import app as dash_app
+timings = {"import": time.perf_counter() - started}
+client = dash_app.app.server.test_client()
+
+started = time.perf_counter()
+client.get("/")
+client.get("/_dash-layout")
+timings["first_layout"] = time.perf_counter() - started
+
+started = time.perf_counter()
+client.post("/_dash-update-component", json={
+    "output": "filter-values.options",
+    "outputs": {"id": "filter-values", "property": "options"},
+    "inputs": [{"id": "filter-column", "property": "value", "value": None}],
+    "changedPropIds": ["filter-column.value"],
+    "state": [{"id": "data-store", "property": "data", "value": None}],
+})
+timings["first_callback"] = time.perf_counter() - started
+
+import pandas as pd
+from charts import build_figure, make_chart_spec
+frame = pd.DataFrame({"x": ["a", "b", "c"], "y": [1, 2, 3]})
+started = time.perf_counter()
+build_figure(frame, make_chart_spec("bar", "x", "y"))
+timings["first_figure"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+STREAMLIT_PROBE = """
+import json, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("app2.py", default_timeout=120).run()
+print(json.dumps({"app2_first_run": time.perf_counter() - started}))
+"""
+
+
+def run_probe(code):
+    env = dict(os.environ, PYTHONPATH=APP_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit=15):
+    """
+    ``(module, cumulative seconds)`` of the slowest imports of app.py, from ``-X importtime``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level imports (single leading space) so nested modules are not double counted
+        if len(name) - len(name.lstrip()) == 1:
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/cold-<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    probes = [DASH_PROBE]
+    if importlib.util.find_spec("streamlit") is not None:
+        probes.append(STREAMLIT_PROBE)
+    else:
+        print("streamlit is not installed; skipping app2.py")
+
+    runs = {}
+    for _ in range(args.repeat):
+        for probe in probes:
+            for name, seconds in run_probe(probe).items():
+                runs.setdefault(name, []).append(seconds)
+
+    results = {name: {"seconds": values, "median_seconds": statistics.median(values)} for name, values in runs.items()}
+    print(f"\nCold start, median of {args.repeat} fresh interpreters:")
+    for name, result in results.items():
+        print(f"  {name:<16} {result['median_seconds'] * 1000:10.1f} ms")
+
+    imports = slowest_imports()
+    print("\nSlowest top-level imports of app.py (cumulative):")
+    for module, seconds in imports:
+        print(f"  {module:<40} {seconds * 1000:10.1f} ms")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)["results"]
+        print(f"\nComparison with {args.compare} (ratio > 1 is slower):")
+        for name, result in results.items():
+            before = previous.get(name)
+            if before and before["median_seconds"]:
+                print(f"  {name:<16} x{result['median_seconds'] / before['median_seconds']:.2f}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "slowest_imports": imports,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"cold-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Load test for the Dash app: callback latency percentiles under concurrent users.
+
+Start the server first (for example ``gunicorn --config app/gunicorn.conf.py
+wsgi:server``). The script writes a synthetic dataset to ``data/raw``, opens
+it through the server-side data source callback, then simulates users that
+page/sort the preview table and open filter options, the interactive
+callbacks every session hits. Each concurrency level runs for a fixed time
+and reports p50/p90/p95/p99 latency per callback.
+
+Usage:
+    python benchmarks/load_test.py --url http://127.0.0.1:8050 --users 1 8 32
+    python benchmarks/load_test.py --rows 1000000 --duration 60 --output benchmarks/results/load.json
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+from run_benchmarks import PROJECT_ROOT, RESULTS_DIR, git_revision, make_dataset
+
+SORTABLE_COLUMNS = ["Region", "Sales", "Units", "Date"]
+FILTER_COLUMNS = ["Region", "Country", "Category"]
+
+
+def _split_output(output):
+    # allow_duplicate outputs carry an "@<hash>" suffix that is not part of the property
+    component_id, prop = output.rsplit(".", 1)
+    return {"id": component_id, "property": prop.split("@")[0]}
+
+
+def parse_outputs(output):
+    """
+    Request ``outputs`` field for a callback's ``output`` string from /_dash-dependencies.
+    """
+    if output.startswith("..") and output.endswith(".."):
+        return [_split_output(part) for part in output[2:-2].split("...")]
+    return _split_output(output)
+
+
+class DashClient:
+    """
+    Minimal client calling Dash callbacks the way the browser does.
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.dependencies = self._get("/_dash-dependencies")
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=60) as response:
+            return json.load(response)
+
+    def find(self, input_id=None, output=None):
+        for dependency in self.dependencies:
+            inputs = {f"{item['id']}.{item['property']}" for item in dependency["inputs"]}
+            if (input_id is None or input_id in inputs) and (output is None or dependency["output"] == output):
+                return dependency
+        raise LookupError(f"No callback with input {input_id!r} / output {output!r}")
+
+    def call(self, dependency, inputs, state=None, changed=None):
+        """
+        Fire a callback with ``inputs``/``state`` given as ``{"id.prop": value}``; returns the response.
+        """
+        def values(items, given):
+            return [
+                {"id": item["id"], "property": item["property"], "value": given.get(f"{item['id']}.{item['property']}")}
+                for item in items
+            ]
+
+        body = {
+            "output": dependency["output"],
+            "outputs": parse_outputs(dependency["output"]),
+            "inputs": values(dependency["inputs"], inputs),
+            "changedPropIds": [changed or next(iter(inputs))],
+            "state": values(dependency["state"], state or {}),
+        }
+        request = urllib.request.Request(
+            self.url + "/_dash-update-component",
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"},
+        )
+        with urllib.request.urlopen(request, timeout=120) as response:
+            payload = response.read()
+            # Decompressing is part of the latency a browser sees
+            if response.headers.get("Content-Encoding") == "gzip":
+                payload = gzip.decompress(payload)
+            return payload
+
+
+def open_dataset(client, path):
+    """
+    Open a server-side file through the data source callback and return its dataset key.
+    """
+    dependency = client.find(input_id="source-path.value")
+    response = json.loads(client.call(dependency, {"source-path.value": path, "source-poll.n_intervals": 0}))
+    return response["response"]["data-store"]["data"]
+
+
+def user_session(client, dataset_key, deadline, samples, errors, seed):
+    """
+    One simulated user: alternate preview paging/sorting and filter option lookups until ``deadline``.
+    """
+    rng = random.Random(seed)
+    preview = client.find(input_id="preview-table.page_current")
+    filter_values = client.find(output="filter-values.options")
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.7:
+            name = "update_preview_page"
+            sort_by = [{"column_id": rng.choice(SORTABLE_COLUMNS), "direction": rng.choice(["asc", "desc"])}]
+            call = lambda: client.call(preview, {
+                "data-store.data": dataset_key,
+                "preview-table.page_current": rng.randrange(50),
+                "preview-table.page_size": 10,
+                "preview-table.sort_by": sort_by if rng.random() < 0.5 else [],
+                "preview-table.filter_query": "",
+            }, changed="preview-table.page_current")
+        else:
+            name = "update_filter_values"
+            call = lambda: client.call(
+                filter_values,
+                {"filter-column.value": rng.choice(FILTER_COLUMNS)},
+                {"data-store.data": dataset_key},
+            )
+        started = time.perf_counter()
+        try:
+            call()
+        except (urllib.error.URLError, OSError) as e:
+            errors.append(f"{name}: {e}")
+            continue
+        samples.append((name, time.perf_counter() - started))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_level(client, dataset_key, users, duration):
+    samples, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=user_session, args=(client, dataset_key, deadline, samples, errors, seed))
+        for seed in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = []
+    for name in sorted({name for name, _ in samples}):
+        latencies = [seconds * 1000 for sample_name, seconds in samples if sample_name == name]
+        results.append({
+            "users": users,
+            "callback": name,
+            "requests": len(latencies),
+            "throughput_rps": len(latencies) / duration,
+            "mean_ms": statistics.mean(latencies),
+            "p50_ms": percentile(latencies, 0.50),
+            "p90_ms": percentile(latencies, 0.90),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+        })
+    return results, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8050")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per concurrency level")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--source", help="Server-side file to open instead of generating one")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+
+    source = args.source
+    if source is None:
+        source = os.path.join(PROJECT_ROOT, "data", "raw", f"loadtest-{args.rows}.parquet")
+        if not os.path.exists(source):
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            make_dataset(args.rows).to_parquet(source, index=False)
+
+    client = DashClient(args.url)
+    dataset_key = open_dataset(client, os.path.abspath(source))
+    print(f"Opened {source} as {dataset_key}")
+
+    results = []
+    print(f"\n{'users':>5}  {'callback':<22} {'req':>6} {'rps':>7} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for users in args.users:
+        level, errors = run_level(client, dataset_key, users, args.duration)
+        results.extend(level)
+        for r in level:
+            print(
+                f"{users:>5}  {r['callback']:<22} {r['requests']:>6} {r['throughput_rps']:>7.1f} "
+                f"{r['p50_ms']:>8.1f} {r['p90_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+            )
+        if errors:
+            print(f"       {len(errors)} failed requests, e.g. {errors[0]}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "url": args.url,
+            "rows": args.rows,
+            "duration": args.duration,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Benchmark harness for the ingest, filter, chart, drill-down and group-by paths.
+
+Generates synthetic datasets of the requested sizes, times each stage and
+records its tracemalloc peak, and writes the results as JSON so runs can be
+compared against each other.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000
+    python benchmarks/run_benchmarks.py --sizes 10000000 --cardinality high --no-memory
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "app"))
+
+import geocoding  # noqa: E402
+from aggregation import group_by, numeric_value_columns  # noqa: E402
+from charts import build_figure, make_chart_spec  # noqa: E402
+from column_index import ColumnIndex  # noqa: E402
+from column_stats import profile_frame  # noqa: E402
+from drilldown import DrilldownTree, compact_payload, dumps_payload, transform_data_for_drilldown  # noqa: E402
+from filters import MaskCache, apply_filters  # noqa: E402
+from rollup import RollupCube  # noqa: E402
+from ingest import preprocess_upload  # noqa: E402
+from time_series import time_order  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Distinct values per hierarchy level for each cardinality profile
+CARDINALITY = {
+    "low": {"Region": 5, "Country": 40, "City": 400, "Store": 2_000, "Category": 12},
+    "high": {"Region": 20, "Country": 200, "City": 2_000, "Store": 50_000, "Category": 500},
+}
+
+
+def make_dataset(rows, cardinality="low", seed=0):
+    """
+    Synthetic sales-like frame with a Region > Country > City > Store hierarchy.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = CARDINALITY[cardinality]
+    store = rng.integers(0, sizes["Store"], rows)
+    city = store % sizes["City"]
+    country = city % sizes["Country"]
+    region = country % sizes["Region"]
+
+    def labels(prefix, codes):
+        names = np.array([f"{prefix} {i}" for i in range(sizes[prefix])], dtype=object)
+        return names[codes]
+
+    return pd.DataFrame({
+        "Region": labels("Region", region),
+        "Country": labels("Country", country),
+        "City": labels("City", city),
+        "Store": labels("Store", store),
+        "Category": rng.integers(0, sizes["Category"], rows).astype(str),
+        "Date": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 4 * 365 * 24, rows), unit="h"),
+        "Units": rng.integers(1, 500, rows),
+        "Sales": rng.gamma(2.0, 150.0, rows).round(2),
+        "Discount": np.where(rng.random(rows) < 0.05, np.nan, rng.random(rows).round(3)),
+    })
+
+
+def write_gazetteer(df, directory):
+    """
+    Offline gazetteer covering every City in ``df``, so map benchmarks never hit the network.
+    """
+    cities = pd.Series(df["City"].unique())
+    rng = np.random.default_rng(1)
+    path = os.path.join(directory, "gazetteer.csv")
+    pd.DataFrame({
+        "name": cities,
+        "lat": rng.uniform(-60, 70, len(cities)),
+        "lon": rng.uniform(-180, 180, len(cities)),
+    }).to_csv(path, index=False)
+    return path
+
+
+def use_offline_geocoder(gazetteer_path):
+    geocoding._default_geocoder = geocoding.Geocoder(
+        [geocoding.GazetteerBackend(gazetteer_path)], store=geocoding.GeocodeStore(":memory:")
+    )
+
+
+def measure(func, repeat, track_memory):
+    """
+    Run ``func`` ``repeat`` times; return (timings, tracemalloc peak of the first run).
+    """
+    timings = []
+    peak = None
+    for run in range(repeat):
+        if track_memory and run == 0:
+            tracemalloc.start()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+        if track_memory and run == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return timings, peak
+
+
+def parquet_contents(df):
+    """
+    ``dcc.Upload``-style data URL of ``df`` written as Parquet.
+    """
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return "data:application/octet-stream;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def stages(df, csv_contents):
+    """
+    ``(name, callable)`` pairs for every benchmarked stage on one dataset.
+    """
+    scope_values = sorted(df["Region"].unique())[:2]
+    predicates = (
+        ("Sales", "range", (100.0, 600.0)),
+        ("Units", "range", (10.0, 400.0)),
+        ("Category", "values", tuple(sorted(df["Category"].unique())[:5])),
+    )
+    mask_cache = MaskCache(df)
+
+    def mask_cache_slider_move():
+        mask_cache.apply(predicates)
+        # Move one slider: only the Sales mask is updated, by delta
+        mask_cache.apply((("Sales", "range", (120.0, 600.0)),) + predicates[1:])
+
+    chart_specs = {
+        "scatter": make_chart_spec("scatter", "Units", "Sales", "Region"),
+        "bar": make_chart_spec("bar", "Region", "Sales"),
+        "line": make_chart_spec("line", "Date", "Sales"),
+        "line_lttb": make_chart_spec("line", "Date", "Sales", resample="none"),
+        "pie": make_chart_spec("pie", "Region", "Sales"),
+        "histogram": make_chart_spec("histogram", "Sales"),
+        "box": make_chart_spec("box", "Region", "Sales"),
+        "map": make_chart_spec("map", y="Sales", color="Region"),
+    }
+
+    yield "ingest.preprocess_upload.csv", lambda: preprocess_upload(csv_contents)
+    parquet_upload = parquet_contents(df)
+    yield "ingest.preprocess_upload.parquet", lambda: preprocess_upload(parquet_upload)
+    yield "ingest.preprocess_upload.parquet_projected", lambda: preprocess_upload(
+        parquet_upload, columns=["Region", "Sales"]
+    )
+    yield "ingest.profile_columns", lambda: profile_frame(df)
+    yield "chart.scope_filter.isin", lambda: df[df["Region"].isin(scope_values)]
+    yield "chart.scope_filter.index_build", lambda: ColumnIndex(df["Region"])
+    region_index = ColumnIndex(df["Region"])
+    yield "chart.scope_filter.index_lookup", lambda: df.iloc[region_index.rows_for(scope_values)]
+    for chart_type, spec in chart_specs.items():
+        yield f"chart.build_figure.{chart_type}", lambda spec=spec: build_figure(df, spec)
+    date_order = time_order(df["Date"])
+    yield "chart.time_order", lambda: time_order(df["Date"])
+    yield "chart.build_figure.line_time_ordered", lambda: build_figure(df, chart_specs["line"], time_order=date_order)
+    yield "app2.filter.single_pass", lambda: apply_filters(df, predicates)
+    yield "app2.filter.incremental", mask_cache_slider_move
+    yield "app2.drilldown", lambda: transform_data_for_drilldown(df, ["Region", "Country", "City", "Store"], "Sales")
+    yield "app2.drilldown.compact_payload", lambda: dumps_payload(
+        compact_payload(DrilldownTree(df, ["Region", "Country", "City", "Store"], "Sales"))
+    )
+    value_columns = numeric_value_columns(df, "Region")
+    yield "app2.group_by.pandas", lambda: group_by(df, "Region", "Sum", value_columns)
+    dimensions = ["Region", "Country", "City", "Store", "Category"]
+    measures = numeric_value_columns(df, "Region")
+    yield "app2.rollup.build", lambda: RollupCube(df, dimensions, measures)
+    cube = RollupCube(df, dimensions, measures)
+    yield "app2.group_by.cube", lambda: cube.group_by("Region", "Mean", value_columns)
+    yield "app2.drilldown.cube", lambda: transform_data_for_drilldown(
+        df, ["Region", "Country", "City", "Store"], "Sales",
+        tree=cube.drilldown_tree(["Region", "Country", "City", "Store"], "Sales"),
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path):
+    """
+    Print the median-time ratio of each stage against a previous results file.
+    """
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {(r["stage"], r["rows"], r["cardinality"]): r for r in json.load(f)["results"]}
+    print(f"\nComparison with {previous_path} (ratio > 1 is slower):")
+    for result in results:
+        before = previous.get((result["stage"], result["rows"], result["cardinality"]))
+        if before and before["median_seconds"]:
+            ratio = result["median_seconds"] / before["median_seconds"]
+            flag = "  <-- regression" if ratio > 1.2 else ""
+            print(f"  {result['stage']:<36} {result['rows']:>10,}  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--cardinality", choices=sorted(CARDINALITY), default="low")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="*", help="Only run stages whose name starts with one of these")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak measurement")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            print(f"\n== {rows:,} rows ({args.cardinality} cardinality) ==")
+            df = make_dataset(rows, args.cardinality)
+            use_offline_geocoder(write_gazetteer(df, tmp))
+            csv_contents = "data:text/csv;base64," + base64.b64encode(df.to_csv(index=False).encode()).decode()
+            for name, func in stages(df, csv_contents):
+                if args.stages and not name.startswith(tuple(args.stages)):
+                    continue
+                timings, peak = measure(func, args.repeat, not args.no_memory)
+                result = {
+                    "stage": name,
+                    "rows": rows,
+                    "cardinality": args.cardinality,
+                    "seconds": timings,
+                    "median_seconds": statistics.median(timings),
+                    "peak_bytes": peak,
+                }
+                results.append(result)
+                peak_text = f"{peak / 1e6:9.1f} MB" if peak is not None else ""
+                print(f"  {name:<36} {result['median_seconds'] * 1000:10.1f} ms {peak_text}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,19 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=[
-        "dash",
-        "pandas",
+        "dash>=2.9",
+        "pandas>=2.0",
         "plotly",
         "seaborn",
         "numpy",
+        "pyarrow",
         "dash-bootstrap-components",
+        "geopy",
     ],
+    extras_require={
+        "aggregation": ["duckdb", "polars>=1.23"],
+        "background": ["dash[diskcache]"],
+        "fast-json": ["orjson"],
+        "production": ["gunicorn", "flask-compress"],
+    },
 )
\ No newline at end of file
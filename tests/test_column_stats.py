@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from column_stats import EXACT_LIMIT, chart_defaults, hll_distinct, profile_frame
+
+
+def test_hll_estimate_within_a_few_percent():
+    rng = np.random.default_rng(0)
+    for true_distinct in (1_000, 50_000, 500_000):
+        values = rng.permutation(true_distinct * 2)[:true_distinct]
+        series = pd.Series(np.concatenate([values, values[: true_distinct // 2]]))
+        estimate = hll_distinct(series)
+        assert abs(estimate - true_distinct) / true_distinct < 0.03
+
+
+def test_hll_ignores_nulls_and_handles_empty_columns():
+    assert hll_distinct(pd.Series([], dtype="float64")) == 0
+    assert hll_distinct(pd.Series([np.nan, np.nan])) == 0
+    assert hll_distinct(pd.Series([1.0, np.nan, 1.0, 2.0])) == 2
+
+
+def test_large_columns_use_estimates_only_when_near_unique():
+    n = EXACT_LIMIT + 50_000
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "level": np.arange(n) % 7,
+    })
+    stats = profile_frame(df)
+    assert stats["id"].distinct_estimated
+    assert abs(stats["id"].distinct - n) / n < 0.03
+    # Few distinct values are recounted exactly
+    assert not stats["level"].distinct_estimated
+    assert stats["level"].distinct == 7
+
+
+def test_chart_defaults_skip_estimated_id_column():
+    n = EXACT_LIMIT + 50_000
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "region": pd.Categorical(rng.choice(["north", "south", "east"], n)),
+        "sales": rng.integers(0, 1_000, n).astype("float64"),
+    })
+    stats = profile_frame(df)
+    # Even when the estimate falls under the row count, the ID is not taken as the measure
+    stats["id"].distinct = n - 100
+    assert chart_defaults(stats) == ("region", "sales")
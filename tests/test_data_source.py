@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+
+from data_source import LocalSource, list_sources
+
+
+def write_partition(path, rows, mtime=None):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_refresh_rereads_only_changed_partitions(tmp_path):
+    source_dir = tmp_path / "sales"
+    source_dir.mkdir()
+    first = str(source_dir / "2024-01.csv")
+    second = str(source_dir / "2024-02.csv")
+    write_partition(first, {"Units": [1, 2]})
+    write_partition(second, {"Units": [3]})
+
+    source = LocalSource(str(source_dir))
+    assert source.changed()
+    assert sorted(source.refresh()) == [first, second]
+    assert source.load()["Units"].tolist() == [1, 2, 3]
+    assert not source.changed()
+    assert source.refresh() == []
+    key = source.dataset_key
+
+    write_partition(second, {"Units": [3, 4]}, mtime=os.stat(second).st_mtime_ns + 10 ** 9)
+    assert source.changed()
+    assert source.refresh() == [second]
+    assert source.load()["Units"].tolist() == [1, 2, 3, 4]
+    assert source.dataset_key != key
+
+
+def test_added_and_removed_partitions(tmp_path):
+    source_dir = tmp_path / "events"
+    source_dir.mkdir()
+    first = str(source_dir / "a.csv")
+    write_partition(first, {"Value": [1.5]})
+    (source_dir / "notes.txt").write_text("not a partition")
+
+    source = LocalSource(str(source_dir))
+    assert len(source.load()) == 1
+
+    added = str(source_dir / "b.csv")
+    write_partition(added, {"Value": [2.5, 3.5]})
+    assert source.refresh() == [added]
+    assert len(source.load()) == 3
+
+    os.remove(first)
+    assert source.changed()
+    assert source.refresh() == []
+    assert source.load()["Value"].tolist() == [2.5, 3.5]
+
+
+def test_unreadable_partition_keeps_previous_copy(tmp_path):
+    path = str(tmp_path / "data.parquet")
+    pd.DataFrame({"Units": [1, 2, 3]}).to_parquet(path, index=False)
+    source = LocalSource(path)
+    assert len(source.load()) == 3
+
+    # Half-written file: the old frame stays and the next refresh tries again
+    with open(path, "wb") as f:
+        f.write(b"PAR1")
+    assert source.refresh() == []
+    assert len(source.load()) == 3
+    assert source.changed()
+
+
+def test_list_sources_finds_files_and_partition_directories(tmp_path):
+    (tmp_path / "single.csv").write_text("a\n1\n")
+    (tmp_path / "parts").mkdir()
+    (tmp_path / "parts" / "p0.parquet").write_bytes(b"")
+    (tmp_path / "empty").mkdir()
+    (tmp_path / "readme.md").write_text("")
+    assert list_sources([str(tmp_path)]) == [str(tmp_path / "parts"), str(tmp_path / "single.csv")]
@@ -0,0 +1,50 @@
+import numpy as np
+
+from downsampling import lttb_indices
+
+
+def sequential_lttb(x, y, n_out):
+    # Textbook bucket-by-bucket LTTB, as a reference
+    n = len(x)
+    kept = [0]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        previous = kept[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        kept.append(start + int(np.argmax(areas)))
+    return np.array(kept + [n - 1])
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 100)
+    kept = lttb_indices(x, y, 500)
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(5_000, dtype=float)
+    y = np.zeros(len(x))
+    y[1234] = 100.0
+    assert 1234 in lttb_indices(x, y, 100)
+
+
+def test_lttb_matches_sequential_algorithm():
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(0, 1e6, 50_000))
+    y = np.cumsum(rng.normal(size=len(x)))
+    for n_out in (3, 17, 1_000, 20_000):
+        np.testing.assert_array_equal(lttb_indices(x, y, n_out), sequential_lttb(x, y, n_out))
+
+
+def test_lttb_short_input_passes_through():
+    x = np.arange(5, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(x, x, 10), np.arange(5))
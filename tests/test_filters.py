@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from filters import MaskCache, active_predicates, apply_filters, combined_mask
+
+
+def make_frame(rows=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    sales = rng.uniform(0, 1_000, rows)
+    sales[rng.choice(rows, 50, replace=False)] = np.nan
+    region = pd.Series(rng.choice(["EU", "US", "APAC", "LATAM"], rows), dtype="category")
+    region[rng.choice(rows, 30, replace=False)] = None
+    return pd.DataFrame({
+        "Sales": sales,
+        "Units": rng.integers(0, 100, rows),
+        "Region": region,
+    })
+
+
+def expected(df, predicates):
+    mask = combined_mask(df, predicates)
+    return df if mask is None else df[mask]
+
+
+def test_incremental_masks_match_full_recompute():
+    df = make_frame()
+    cache = MaskCache(df)
+    rng = np.random.default_rng(1)
+    regions = ["EU", "US", "APAC", "LATAM"]
+    sales = (0.0, 1_000.0)
+    units = (0, 99)
+    selected = tuple(regions)
+    for _ in range(200):
+        # Move one widget at a time, as a user does between reruns
+        widget = rng.integers(3)
+        if widget == 0:
+            low, high = sorted(rng.uniform(-50, 1_050, 2))
+            sales = (low, high)
+        elif widget == 1:
+            low, high = sorted(rng.integers(-5, 105, 2).tolist())
+            units = (low, high)
+        else:
+            selected = tuple(region for region in regions if rng.random() < 0.6)
+        predicates = (
+            ("Sales", "range", sales),
+            ("Units", "range", units),
+            ("Region", "values", selected),
+        )
+        pd.testing.assert_frame_equal(cache.apply(predicates), expected(df, predicates))
+
+
+def test_disjoint_slider_move_rebuilds_range_mask():
+    df = make_frame()
+    cache = MaskCache(df)
+    for bounds in [(0.0, 100.0), (900.0, 1_000.0), (50.0, 950.0), (500.0, 500.0)]:
+        predicates = (("Sales", "range", bounds),)
+        pd.testing.assert_frame_equal(cache.apply(predicates), expected(df, predicates))
+
+
+def test_noop_predicates_keep_every_row():
+    df = make_frame()
+    options = {"Units": ("range", 0.0, 99.0), "Region": ("values", ["EU", "US", "APAC", "LATAM"])}
+    predicates = [("Units", "range", (0.0, 99.0)), ("Region", "values", ("EU", "US", "APAC", "LATAM"))]
+    assert active_predicates(predicates, options) == ()
+    assert apply_filters(df, predicates, options) is df
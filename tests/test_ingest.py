@@ -0,0 +1,23 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+from ingest import downcast_numeric, preprocess_upload
+
+
+def csv_upload(text):
+    return "data:text/csv;base64," + base64.b64encode(text.encode()).decode()
+
+
+def test_decimal_column_survives_upload_unchanged():
+    df, _ = preprocess_upload(csv_upload("Item,Price\na,19.99\nb,0.1\nc,1234.56\nd,\n"))
+    assert df["Price"].dtype == np.float64
+    assert df["Price"].iloc[:3].tolist() == [19.99, 0.1, 1234.56]
+    assert np.isnan(df["Price"].iloc[3])
+
+
+def test_float_column_downcast_only_when_exact():
+    df = downcast_numeric(pd.DataFrame({"exact": [1.5, 2.0, np.nan], "inexact": [19.99, 2.0, 3.0]}))
+    assert df["exact"].dtype == np.float32
+    assert df["inexact"].dtype == np.float64